@@ -0,0 +1,187 @@
+"""
+Time charty across chart types and data sizes.
+
+Every combination of chart type, point count and series count is built and
+written out, and the time taken by each step is recorded along with the
+size of the output:
+
+    python benchmarks/bench.py -o results.json
+    python benchmarks/bench.py --sizes 10,1000 --series 1,5 --charts Line,Pie
+
+Building covers constructing the chart and rendering its svg tree; output
+covers serializing the tree to a file. Each is the best of --repeat runs.
+Results are written as JSON, and a run can be compared against an earlier
+one, e.g. from another commit:
+
+    python benchmarks/bench.py -o after.json --compare before.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from charty.charty import Line, Column, StackedColumn, Pie, Sparkline
+
+CHARTS = {
+    'Line': Line,
+    'Column': Column,
+    'StackedColumn': StackedColumn,
+    'Pie': Pie,
+    'Sparkline': Sparkline,
+}
+DEFAULT_CHARTS = ['Line', 'Column', 'StackedColumn', 'Pie']
+DEFAULT_SIZES = [10, 1000, 100000, 1000000]
+DEFAULT_SERIES = [1, 5, 20]
+
+
+def make_data(chart, points, series, seed=0):
+    """
+        *points* values split evenly over *series* series. A Pie draws the
+        points of all its series as slices of one circle, so splitting them
+        up would draw the same chart; its points all go in one series
+    """
+    rand = random.Random(seed)
+    if chart == 'Pie':
+        return [[('slice %s' % i, rand.randint(1, 1000)) for i in xrange(points)]]
+    per_series = max(1, points // series)
+    return [[(x, rand.randint(1, 1000)) for x in xrange(per_series)] for _ in xrange(series)]
+
+
+def best_of(repeat, function):
+    """ The shortest of *repeat* timings of function(), and its last result """
+    best = None
+    for _ in xrange(repeat):
+        gc.collect()
+        start = time.time()
+        result = function()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def run_case(chart, points, series, repeat, pretty):
+    data = make_data(chart, points, series)
+    cls = CHARTS[chart]
+
+    def build():
+        c = cls(800, 400, data)
+        c.render()
+        return c
+    build_seconds, built = best_of(repeat, build)
+
+    fd, path = tempfile.mkstemp(suffix='.svg')
+    os.close(fd)
+    try:
+        output_seconds, _ = best_of(repeat, lambda: built.output(path, pretty=pretty))
+        size = os.path.getsize(path)
+    finally:
+        os.remove(path)
+
+    return {
+        'chart': chart,
+        'points': points,
+        'series': series if chart != 'Pie' else 1,
+        'build_seconds': build_seconds,
+        'output_seconds': output_seconds,
+        'bytes': size,
+    }
+
+
+def environment():
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    try:
+        commit = subprocess.Popen(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0].strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': numpy_version,
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def case_key(result):
+    return (result['chart'], result['points'], result['series'])
+
+
+def compare(results, baseline):
+    """ Print how each case changed against a baseline run """
+    before = dict((case_key(r), r) for r in baseline['results'])
+    sys.stderr.write('%-14s %8s %6s %12s %12s %10s\n' % ('chart', 'points', 'series', 'build', 'output', 'bytes'))
+    for r in results:
+        old = before.get(case_key(r))
+        if old is None:
+            continue
+        ratios = []
+        for field in ('build_seconds', 'output_seconds', 'bytes'):
+            if old[field]:
+                ratios.append('%.2fx' % (r[field] / float(old[field])))
+            else:
+                ratios.append('-')
+        sys.stderr.write('%-14s %8s %6s %12s %12s %10s\n' % ((r['chart'], r['points'], r['series']) + tuple(ratios)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--charts', default=','.join(DEFAULT_CHARTS), help='chart types to run (default: all)')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='point counts to run')
+    parser.add_argument('--series', default=','.join(map(str, DEFAULT_SERIES)), help='series counts to run')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each case to take the best of')
+    parser.add_argument('--pretty', action='store_true', help='time indented output')
+    parser.add_argument('-o', '--output', default='bench.json', help='file to write results to')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args(argv)
+
+    charts = args.charts.split(',')
+    for chart in charts:
+        if chart not in CHARTS:
+            parser.error('unknown chart type %r' % chart)
+    sizes = [int(n) for n in args.sizes.split(',')]
+    series_counts = [int(n) for n in args.series.split(',')]
+
+    results = []
+    for chart in charts:
+        for points in sizes:
+            #pie charts only draw one series, so they are run once per size
+            for series in (series_counts if chart != 'Pie' else series_counts[:1]):
+                result = run_case(chart, points, series, args.repeat, args.pretty)
+                results.append(result)
+                sys.stderr.write('%-14s %8s points %3s series  build %8.4fs  output %8.4fs  %10s bytes\n' % (
+                    chart, points, result['series'], result['build_seconds'], result['output_seconds'], result['bytes']))
+
+    report = {'environment': environment(), 'pretty': args.pretty, 'results': results}
+    f = open(args.output, 'w')
+    try:
+        json.dump(report, f, indent=2, sort_keys=True)
+    finally:
+        f.close()
+
+    if args.compare:
+        f = open(args.compare)
+        try:
+            baseline = json.load(f)
+        finally:
+            f.close()
+        compare(results, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,9 @@
- 
+from batch import render_batch, render_spec, make_chart
+from cache import RenderCache
+from timing import record_phases
+from dashboard import Dashboard
+from series import Columns
+from stylesheet import Stylesheet
+import loaders as io
+from loaders import read_csv, read_binary
+from aio import render_async
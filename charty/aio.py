@@ -0,0 +1,114 @@
+"""
+Rendering charts from an asyncio event loop.
+
+Drawing a large chart takes long enough to stall an event loop, so
+render_async builds and serializes the chart on an executor and gives the
+loop a future of the document's bytes to wait on:
+
+    svg = await charty.render_async(spec, semaphore=chart_slots)
+    response.write(svg)
+
+(or yield From(...) under trollius, which is used when asyncio isn't
+available). The spec is a chart spec (see batch.py) or a chart object. By
+default the loop's default executor does the work; any other executor can
+be given, and a shared asyncio.Semaphore caps how many charts are drawn at
+once, with the rest waiting their turn without taking up the executor.
+
+Cancelling the future stops the chart at the start of its next phase of
+drawing (see timing.py), or before it's started if it's still waiting,
+rather than leaving it to run to the end. Charts already handed to a
+process pool can't be reached that way and run to completion.
+"""
+
+import threading
+
+try:
+    import asyncio
+except ImportError:
+    try:
+        import trollius as asyncio
+    except ImportError:
+        asyncio = None
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = None
+
+from batch import make_chart
+from timing import cancellable, check_cancelled
+
+
+def _render(spec, pretty, compress, cancel):
+    if cancel is None:
+        return _render_chart(spec, pretty, compress)
+    with cancellable(cancel):
+        check_cancelled()
+        return _render_chart(spec, pretty, compress)
+
+
+def _render_chart(spec, pretty, compress):
+    chart = spec if hasattr(spec, 'render') else make_chart(spec)
+    return chart.render_bytes(pretty, compress)
+
+
+def render_async(spec, pretty=False, compress=False, executor=None, semaphore=None, loop=None):
+    """
+        Draw the chart a spec describes, or a chart object, on *executor*
+        (the loop's default executor if None) and return an asyncio future
+        of its svg as bytes, compressed if *compress* is set. When a
+        *semaphore* is given the chart isn't started until it can be
+        acquired, and it's released once the chart is done. Cancelling
+        the future stops the chart at its next phase
+    """
+    if asyncio is None:
+        raise ImportError("render_async needs asyncio, or trollius on Python 2")
+    if loop is None:
+        loop = asyncio.get_event_loop()
+    result = asyncio.Future(loop=loop)
+    if ProcessPoolExecutor is not None and isinstance(executor, ProcessPoolExecutor):
+        cancel = None
+    else:
+        cancel = threading.Event()
+    state = {'acquiring': None, 'work': None}
+
+    def finish(work):
+        if semaphore is not None:
+            semaphore.release()
+        if work.cancelled():
+            result.cancel()
+            return
+        #retrieved even when the result is no longer wanted, so the loop doesn't log it as lost
+        error = work.exception()
+        if result.done():
+            return
+        if error is not None:
+            result.set_exception(error)
+        else:
+            result.set_result(work.result())
+
+    def start(acquiring=None):
+        if acquiring is not None and acquiring.cancelled():
+            return
+        if result.done():
+            if acquiring is not None:
+                semaphore.release()
+            return
+        state['work'] = loop.run_in_executor(executor, _render, spec, pretty, compress, cancel)
+        state['work'].add_done_callback(finish)
+
+    def cancelled(result):
+        if not result.cancelled():
+            return
+        if cancel is not None:
+            cancel.set()
+        if state['acquiring'] is not None:
+            state['acquiring'].cancel()
+
+    result.add_done_callback(cancelled)
+    if semaphore is None:
+        start()
+    else:
+        state['acquiring'] = loop.create_task(semaphore.acquire())
+        state['acquiring'].add_done_callback(start)
+    return result
@@ -0,0 +1,193 @@
+"""
+Rendering many charts at once.
+
+A chart spec describes one chart as plain data, so it can be sent to another
+process: either a dict
+
+    {'chart': 'Line', 'width': 600, 'height': 300, 'data': [...],
+     'stylesheet': 'css/linechart.css', 'kwargs': {'label_intervals': 2}}
+
+or the tuple (chart, width, height, data, stylesheet, kwargs), where chart is
+a chart class or its name and stylesheet and kwargs may be left off.
+
+render_batch fans specs out across a pool of worker processes and yields the
+rendered documents as they complete. Each spec is pickled before it's handed
+to the pool, with any streamed series read into lists first, so a spec that
+can't be sent (a lambda among its options, say) fails on its own rather than
+taking its chunk down with it.
+"""
+
+import cPickle
+import multiprocessing
+import Queue
+import traceback
+from collections import namedtuple
+from itertools import islice
+
+from charty import Line, Column, StackedColumn, Pie, Sparkline
+from series import columnar, materialize
+
+CHART_TYPES = {
+    'Line': Line,
+    'Column': Column,
+    'StackedColumn': StackedColumn,
+    'Pie': Pie,
+    'Sparkline': Sparkline,
+}
+
+#specs sent to a worker at a time when the number of specs isn't known
+DEFAULT_CHUNKSIZE = 32
+#chunks queued per worker at a time
+MAX_PENDING_CHUNKS = 2
+
+BatchResult = namedtuple('BatchResult', 'index svg error')
+
+
+def spec_arguments(spec):
+    """
+        The chart class, width, height, data, stylesheet and keyword options
+        a spec describes
+    """
+    if isinstance(spec, dict):
+        chart = spec['chart']
+        width, height, data = spec['width'], spec['height'], spec['data']
+        stylesheet = spec.get('stylesheet')
+        kwargs = spec.get('kwargs') or {}
+    else:
+        chart, width, height, data = spec[:4]
+        stylesheet = spec[4] if len(spec) > 4 else None
+        kwargs = spec[5] if len(spec) > 5 else {}
+
+    if isinstance(chart, basestring):
+        try:
+            chart = CHART_TYPES[chart]
+        except KeyError:
+            raise ValueError("Unknown chart type %r" % chart)
+    return chart, width, height, data, stylesheet, kwargs
+
+
+def make_chart(spec):
+    """ Construct the chart a spec describes """
+    chart, width, height, data, stylesheet, kwargs = spec_arguments(spec)
+    return chart(width, height, data, stylesheet, **kwargs)
+
+
+def render_spec(spec, pretty=False, compress=False):
+    """ Build the chart a spec describes and return its svg as a string """
+    return make_chart(spec).render_bytes(pretty, compress)
+
+
+def _render_chunk(jobs):
+    results = []
+    for index, spec, pretty, compress in jobs:
+        try:
+            results.append(BatchResult(index, render_spec(spec, pretty, compress), None))
+        except Exception:
+            results.append(BatchResult(index, None, traceback.format_exc()))
+    return results
+
+
+def _portable(spec):
+    """ The spec with any series that can only be read once read into a list, so it can be pickled """
+    if isinstance(spec, dict):
+        spec = dict(spec)
+        spec['data'] = materialize(columnar(spec['data']))
+        return spec
+    return tuple(spec[:3]) + (materialize(columnar(spec[3])),) + tuple(spec[4:])
+
+
+def _pack(chunk):
+    """
+        Pickle each job of a chunk for a worker. Returns the (index, pickle)
+        of the jobs that could be pickled, and a failed BatchResult for
+        each one that couldn't
+    """
+    packed = []
+    failed = []
+    for index, spec, pretty, compress in chunk:
+        try:
+            packed.append((index, cPickle.dumps((_portable(spec), pretty, compress), cPickle.HIGHEST_PROTOCOL)))
+        except Exception:
+            failed.append(BatchResult(index, None, traceback.format_exc()))
+    return packed, failed
+
+
+def _render_packed(packed):
+    results = []
+    for index, job in packed:
+        try:
+            spec, pretty, compress = cPickle.loads(job)
+            results.append(BatchResult(index, render_spec(spec, pretty, compress), None))
+        except Exception:
+            results.append(BatchResult(index, None, traceback.format_exc()))
+    return results
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def render_batch(specs, workers=None, chunksize=None, pretty=False, compress=False):
+    """
+        Render an iterable of chart specs on a pool of *workers* processes
+        (one per cpu by default), handing specs to workers *chunksize* at a
+        time. Yields a BatchResult for each spec in the order they finish:
+        index is the spec's position in *specs*, and svg is the rendered
+        document, or None with error holding the traceback if that chart
+        failed or its spec couldn't be sent to a worker. A failed chart
+        doesn't stop the rest of the batch.
+
+        Specs are read from *specs* only as workers free up, so it can be a
+        generator too large to hold in memory.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    jobs = ((index, spec, pretty, compress) for index, spec in enumerate(specs))
+
+    if workers <= 1:
+        for chunk in _chunks(jobs, chunksize or DEFAULT_CHUNKSIZE):
+            for result in _render_chunk(chunk):
+                yield result
+        return
+
+    if chunksize is None:
+        if hasattr(specs, '__len__'):
+            chunksize = max(1, len(specs) // (workers * 4))
+        else:
+            chunksize = DEFAULT_CHUNKSIZE
+    chunks = _chunks(jobs, chunksize)
+
+    #chunks are submitted a few at a time rather than all at once, so that
+    #stopping early only waits on the ones already handed out (terminating
+    #a pool with queued work can deadlock). The pool only calls back for
+    #work it managed to send, which is why jobs are pickled here first:
+    #one it couldn't send would leave finished.get() waiting forever
+    finished = Queue.Queue()
+    pool = multiprocessing.Pool(workers)
+    try:
+        pending = 0
+        while True:
+            while pending < workers * MAX_PENDING_CHUNKS:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                packed, failed = _pack(chunk)
+                for result in failed:
+                    yield result
+                if packed:
+                    pool.apply_async(_render_packed, (packed,), callback=finished.put)
+                    pending += 1
+            if not pending:
+                break
+            results = finished.get()
+            pending -= 1
+            for result in results:
+                yield result
+    finally:
+        pool.close()
+        pool.join()
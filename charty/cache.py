@@ -0,0 +1,165 @@
+"""
+Caching rendered charts.
+
+The same chart is often asked for over and over. A RenderCache keys each
+rendering on a sha1 of everything that goes into it: the chart class, its
+size, data, stylesheet css and keyword options. A chart seen before is
+returned as the stored svg string without being laid out or drawn.
+
+Renderings are kept in memory, least recently used first out once there are
+more than max_entries of them (or more than max_bytes of svg), and, if the
+cache is given a directory, on disk as well, where they outlive the process.
+"""
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+from hashlib import sha1
+
+from batch import spec_arguments
+from series import columnar, is_stream, series_key
+from stylesheet import get_stylesheet
+
+#how many renderings to keep in memory by default
+MAX_CACHED_RENDERINGS = 256
+
+CacheInfo = namedtuple('CacheInfo', 'hits disk_hits misses evictions entries bytes')
+
+
+class RenderCache(object):
+    """Rendered svg documents, keyed on the chart specs they came from
+       (see charty/batch.py for the spec format).
+
+       hits - renderings found in memory
+       disk_hits - renderings found on disk, and not in memory
+       misses - renderings that had to be drawn
+       evictions - renderings dropped from memory to make room
+    """
+    def __init__(self, max_entries=MAX_CACHED_RENDERINGS, max_bytes=None, directory=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, spec, pretty=False, compress=False):
+        """ The hex digest identifying a spec's rendering """
+        chart, width, height, data, stylesheet, kwargs = spec_arguments(spec)
+        stylesheet = get_stylesheet(stylesheet)
+        digest = sha1()
+        digest.update('%s.%s\0%r\0%r\0%r\0%r\0' % (chart.__module__, chart.__name__, width, height, pretty, compress))
+        css = stylesheet.css if stylesheet is not None else ''
+        if isinstance(css, unicode):
+            css = css.encode('utf-8')
+        digest.update(css)
+        digest.update('\0%r\0' % sorted(kwargs.items()))
+        for series in columnar(data):
+            if is_stream(series):
+                raise TypeError('a series that can only be read once has no cache key, give it as a list')
+            digest.update(series_key(series))
+            digest.update('\0')
+        return digest.hexdigest()
+
+    def render(self, spec, pretty=False, compress=False):
+        """
+            The svg string for a spec, drawing the chart only if it isn't
+            cached already
+        """
+        key = self.key(spec, pretty, compress)
+        svg = self.get(key)
+        if svg is None:
+            chart, width, height, data, stylesheet, kwargs = spec_arguments(spec)
+            svg = chart(width, height, data, stylesheet, **kwargs).render_bytes(pretty, compress)
+            self.put(key, svg)
+        return svg
+
+    def get(self, key):
+        """ The rendering stored under key, or None """
+        with self._lock:
+            svg = self._entries.pop(key, None)
+            if svg is not None:
+                self._entries[key] = svg
+                self.hits += 1
+                return svg
+
+        svg = self._read(key)
+        with self._lock:
+            if svg is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+                self._remember(key, svg)
+        return svg
+
+    def put(self, key, svg):
+        """ Store a rendering under key """
+        with self._lock:
+            self._remember(key, svg)
+        self._write(key, svg)
+
+    def clear(self):
+        """ Empty the memory tier. Files on disk are left alone """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.disk_hits, self.misses, self.evictions,
+                             len(self._entries), self._bytes)
+
+    def _remember(self, key, svg):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = svg
+        self._bytes += len(svg)
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            self._bytes -= len(self._entries.popitem(last=False)[1])
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.svg')
+
+    def _read(self, key):
+        if self.directory is None:
+            return None
+        try:
+            f = open(self._path(key), 'rb')
+        except IOError:
+            return None
+        try:
+            return f.read()
+        finally:
+            f.close()
+
+    def _write(self, key, svg):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        folder = os.path.dirname(path)
+        if not os.path.isdir(folder):
+            try:
+                os.makedirs(folder)
+            except OSError:
+                if not os.path.isdir(folder):
+                    raise
+        #write to a temporary file first so readers never see part of a file
+        fd, temp_path = tempfile.mkstemp(dir=folder)
+        try:
+            f = os.fdopen(fd, 'wb')
+            try:
+                f.write(svg)
+            finally:
+                f.close()
+            os.rename(temp_path, path)
+        except:
+            os.remove(temp_path)
+            raise
@@ -1,13 +1,112 @@
 
 import xml.etree.ElementTree as ET
-from xml.dom.minidom import parseString
+import logging
 import math
-from utils import nice
+import gzip
+from datetime import date, datetime
+from cStringIO import StringIO
+from utils import nice, downsample
+from stylesheet import get_stylesheet
+from serializer import write_svg
+from stats import DataStats
+from series import columnar, materialize, point_count
+from timing import timed, count_elements
+from nodes import Node
+from paths import PATH_PRECISION, number_formatter, compact_path, spaced_xs, spaced_path, rect_path
+import coordinates
+
+log = logging.getLogger('charty')
+log.addHandler(logging.NullHandler())
 
 CURRENCY = [( 10**3, 'Th'), (10**6, 'M'), (10**9, 'B'), (10**12, 'Tr')]
 
+#numeric x axes spanning more values than this are placed by value instead of getting a label slot for every integer
+MAX_DENSE_LABELS = 10000
 
-class Chart(object):
+#element classes the svg tree can be built from; see nodes.py
+BACKENDS = {
+    'etree': ET.Element,
+    'lite': Node,
+}
+
+#zlib level used for svgz output, which trades a little size for a lot of speed over the maximum
+SVGZ_COMPRESSLEVEL = 6
+
+EPOCH = datetime(1970, 1, 1)
+
+#strftime formats for time axis labels, by the least number of seconds between ticks
+TIME_FORMATS = [(365 * 86400, '%Y'), (28 * 86400, '%b %Y'), (86400, '%b %d'), (60, '%H:%M'), (0, '%H:%M:%S')]
+
+#the values a Sparkline can mark with a dot
+SPARKLINE_MARKERS = ('min', 'max', 'last')
+
+
+def as_datetime(value):
+    """ Dates become datetimes at midnight; datetimes are returned as is """
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, datetime.min.time())
+
+def seconds_since_epoch(value):
+    """ A date or naive datetime as a number of seconds, for placing it on a time axis """
+    return (as_datetime(value) - EPOCH).total_seconds()
+
+
+
+class Document(object):
+    """Writing out an svg tree. Subclasses provide it as the svg property,
+       along with the phase_hook and _svg attributes timing.timed expects
+    """
+    def write(self, f, pretty=False, compress=False):
+        """
+            Stream the svg xml tree as text to a writable file object,
+            gzip compressing it on the way (svgz) if compress is True
+        """
+        root = self.svg
+        with timed(self, 'output', lambda: count_elements(root)):
+            if compress:
+                gz = gzip.GzipFile(filename='', mode='wb', compresslevel=SVGZ_COMPRESSLEVEL, fileobj=f, mtime=0)
+                try:
+                    write_svg(root, gz.write, pretty)
+                finally:
+                    gz.close()
+            else:
+                write_svg(root, f.write, pretty)
+
+    def output(self, write_file, pretty=False, compress=None):
+        """
+            Output the svg xml tree as text. write_file is either a path or
+            anything with a write method (an open file, a BytesIO, a socket's
+            makefile()); file objects are left open for the caller.
+            Output is compact unless pretty is True, and is gzip compressed
+            if compress is True or write_file is a path ending in .svgz
+        """
+        #DEBUG - Dump properties
+        #for x in self.__dict__.keys():
+            #pass#print "%s : %s\n" % (x, self.__dict__[x]) 
+        if hasattr(write_file, 'write'):
+            self.write(write_file, pretty, bool(compress))
+            return
+
+        if compress is None:
+            compress = write_file.lower().endswith('.svgz')
+        f = open(write_file, 'wb')
+        try:
+            self.write(f, pretty, compress)
+        finally:
+            f.close()
+
+    def render_bytes(self, pretty=False, compress=False):
+        """
+            Return the svg document as a byte string, ready to be sent as a
+            response body (gzip compressed if compress is True)
+        """
+        buf = StringIO()
+        self.write(buf, pretty, compress)
+        return buf.getvalue()
+
+
+class Chart(Document):
     """Base class for SVG chart generation
        Data is expected in a list of lists, with (x,y) tuples:
             [ [(1, 2),(2, 3), ..], [...] ]
@@ -16,59 +115,131 @@ class Chart(object):
     
             [ [('risk transfers', 300), ('loans', 200), ..], ... ] 
 
+       Constructing a chart only records its options. The layout is worked
+       out the first time it's needed, and the svg tree is built the first
+       time it's rendered or output; both are then kept for later calls.
     """
     def __init__(self, width, height, data, stylesheet=None, **kwargs):
         
         self.height = height
         self.width = width
-        self.data = data
+        self.data = columnar(data)
         self.numeric_labels = False
-        self.number_of_series = len(data)
-        self.labels = self.extract_labels()
+        self.sparse_labels = None
+        self.sparse_axis = False
+        self.time_axis = False
+        self.time_format = None
+        self.number_of_series = len(self.data)
         self.label_rotate = 0
-        self.stylesheet = stylesheet
+        self.stylesheet = get_stylesheet(stylesheet)
         self.padding = 30
         self.x_padding = 0
         self.y_padding = 0
         self.currency = False
         self.units = ''
         self.show_decimal = False
+        self.precision = None #decimal places to round coordinates to
+        self.x_range = None #(lowest, highest) x label, if known without reading the data
+        self.y_range = None #(lowest, highest) y value, likewise
+        self.data_stats = None #a DataStats for the data if it's already been gathered, as the loaders do
+        self.backend = 'etree' #or 'lite' to build the tree from lighter nodes that can only be written out
+        self.phase_hook = None #called with each phase's name, duration and element count, see timing.py
+        self._laid_out = False
+        self._svg = None
+
+    def layout(self):
+        """
+            Scan the data and work out the chart's geometry, without building
+            any elements. Only the first call does any work
+        """
+        if not self._laid_out:
+            with timed(self, 'stats', self.count_points):
+                self.stats = self.gather_stats()
+                self.labels = self.extract_labels()
+            with timed(self, 'layout'):
+                self.setup_layout()
+            self._laid_out = True
+
+    def gather_stats(self):
+        """ The DataStats of the chart's data: given, standing in for it, or gathered from it """
+        if self.data_stats is not None:
+            return self.data_stats
+        if self.single_pass():
+            return DataStats.from_bounds(self.x_range, self.y_range)
+        #series that can only be read once are read into lists, see series.py
+        self.data = materialize(self.data)
+        return DataStats(self.data)
+
+    def single_pass(self):
+        """
+            Whether the chart can be laid out from its x_range and y_range
+            and draw each series in one pass without reading the data first.
+            Chart subclasses that can say so here
+        """
+        return False
 
- 
-        #create svg node as root element in tree
-        self.svg = ET.Element('svg', xmlns="http://www.w3.org/2000/svg", version="1.1", height=str(self.height), width=str(self.width) )
-        self.svg.attrib["xmlns:svg"] = "http://www.w3.org/2000/svg"
-         
-        #there really isn't a graceful way for loading an external stylesheet when you're not in a browser so we parse it in and spit it out inside style tags
-        temp = []
-        stylesheet = open(self.stylesheet, 'r')
-        for x in stylesheet.readlines():
-            temp.append(x)
-        self.svg.append(ET.XML('<style type="text/css">' + "\n".join(temp)  + '</style>'))
+    def count_points(self):
+        return point_count(self.data)
 
-    def find_y_minimum(self):
-        min_y_value = None
+    def setup_layout(self):
+        """ Chart subclasses compute their dimensions and scales here """
+        pass
 
-        for series in self.data:
-            #Because series are incrementally numbered, we allow for a place holder to keep styles consistent
-            if series != 'placeholder':
-                for point in series:
-                    if not min_y_value or (not isinstance(point[1], "".__class__) and point[1] < min_y_value): min_y_value = point[1]
+    def update_data(self, data):
+        """
+            Replace the chart's data. The layout and svg tree are worked out
+            again the next time they're needed
+        """
+        self.data = columnar(data)
+        self.number_of_series = len(self.data)
+        self.data_stats = None
+        self._laid_out = False
+        self._svg = None
 
-        return min_y_value
+    def render(self):
+        """
+            Build the svg xml tree, laying the chart out first if needed, and
+            return its root. The tree is built once and reused by later calls
+        """
+        if self._svg is None:
+            self.layout()
+            self.element = BACKENDS[self.backend]
+            self.coord = number_formatter(self.precision)
+
+            #create svg node as root element in tree
+            self._svg = self.element('svg', xmlns="http://www.w3.org/2000/svg", version="1.1", height=str(self.height), width=str(self.width) )
+            self._svg.attrib["xmlns:svg"] = "http://www.w3.org/2000/svg"
+             
+            #stylesheets are parsed once per process and their style node shared between charts
+            if self.stylesheet is not None:
+                self._svg.append(self.stylesheet.node)
+
+            try:
+                self.draw()
+            except:
+                self._svg = None
+                raise
+        return self._svg
+
+    def draw(self):
+        """ Chart subclasses add their elements to the svg tree here """
+        pass
+
+    @property
+    def svg(self):
+        return self.render()
+
+    def find_y_minimum(self):
+        return self.stats.min_y
 
     def find_y_maximum(self):
         """
-            Function to find the maximum x and y values of all series 
-            as well as the maximum number of points in a given series
+            Function to find the maximum y value of all series, or 0 if
+            every value is below it
         """
         max_y_value = 0
-
-        for series in self.data:
-            #Because series are incrementally numbered, we allow for a place holder to keep styles consistent
-            if series != 'placeholder':
-                for point in series:
-                    if not isinstance(point[1], "".__class__) and point[1] > max_y_value: max_y_value = point[1]
+        if self.stats.max_y is not None and self.stats.max_y > max_y_value:
+            max_y_value = self.stats.max_y
 
         return max_y_value
 
@@ -80,33 +251,59 @@ class Chart(object):
                 break
         if numeric:
             self.numeric_labels = True
+            if self.use_sparse_axis(labels):
+                return self.sparse_labels_for(labels)
             return [x for x in range(min(labels), max(labels)+1)]
         else: return labels
 
-    def extract_labels(self):
+    def use_sparse_axis(self, labels):
         """
-            Pull out the distinct labels from each data series
-        """ 
-        labels = []
-        self.numeric_labels = True
-        for series in self.data:
-            if series != 'placeholder':
-                for point in series:
-                    if isinstance(point[0], str): self.numeric_labels = False
-                    if not point[0] in labels: labels.append(point[0])
+            Decide whether numeric labels are placed by value. Unless the
+            sparse_labels keyword forces it either way, only integer labels
+            spanning fewer than MAX_DENSE_LABELS values get a slot per integer.
+            Dates and datetimes are always placed by time
+        """
+        self.time_axis = True
+        for l in labels:
+            if not isinstance(l, date):
+                self.time_axis = False
+                break
+        if self.time_axis:
+            self.sparse_axis = True
+        elif self.sparse_labels is None:
+            integral = True
+            for l in labels:
+                if not isinstance(l, (int, long)):
+                    integral = False
+                    break
+            self.sparse_axis = not integral or max(labels) - min(labels) >= MAX_DENSE_LABELS
+        else:
+            self.sparse_axis = bool(self.sparse_labels)
+        return self.sparse_axis
 
-        return self.are_labels_numeric(labels)
-            
-    def output(self, write_file):
+    def sparse_labels_for(self, labels):
         """
-            Output the svg xml tree as text
+            Sort the distinct numeric labels and find the smallest gap between
+            neighbours, which becomes the width of one slot on the axis
         """
-        #DEBUG - Dump properties
-        #for x in self.__dict__.keys():
-            #pass#print "%s : %s\n" % (x, self.__dict__[x]) 
-        txt = ET.tostring(self.svg)
-        f = open(write_file, 'w')
-        f.write(parseString(txt).toprettyxml() )
+        labels = sorted(labels)
+        keys = labels
+        if self.time_axis:
+            keys = [seconds_since_epoch(l) for l in labels]
+        self.x_origin = keys[0]
+        if len(keys) > 1:
+            self.x_unit = min(keys[i + 1] - keys[i] for i in xrange(len(keys) - 1))
+        else:
+            self.x_unit = 1
+        return labels
+
+    def extract_labels(self):
+        """
+            The distinct labels from each data series, in the order they
+            first appear
+        """ 
+        self.numeric_labels = self.stats.numeric_labels
+        return self.are_labels_numeric(self.stats.labels)
    
 class Pie(Chart):
     """Subclass of Chart, containing functions relevant to all pie charts"""
@@ -118,12 +315,11 @@ class Pie(Chart):
         #Catch passed in keyword argument overrides of defaults
         for key in kwargs:
             self.__dict__[key] = kwargs[key]
+
+    def setup_layout(self):
              
         #find sum of values, only needed for pie charts
-        self.total = 0
-        for series in self.data:
-            for point in series:
-                self.total += point[1]
+        self.total = self.stats.total
 
         if (self.width - (2 * self.x_padding)) > (self.height - (2 * self.y_padding)):
             self.diameter = self.height - (2 * self.y_padding) - (2 * self.padding)
@@ -133,9 +329,12 @@ class Pie(Chart):
         self.radius = self.diameter / 2
         self.x_origin = self.radius + self.x_padding + self.padding
         self.y_origin = self.radius + self.y_padding + self.padding
-        self.svg.append(ET.Element("rect", x="0", y="0", height="%s" % self.height, width="%s" % self.width, fill="white"))  # attach stage
+
+    def draw(self):
+        self.svg.append(self.element("rect", x="0", y="0", height="%s" % self.height, width="%s" % self.width, fill="white"))  # attach stage
         
-        self.data_series() #Chart subclass should have this method to chart the data series
+        with timed(self, 'data_series'):
+            self.data_series() #Chart subclass should have this method to chart the data series
 
     
     def data_series(self):
@@ -145,6 +344,8 @@ class Pie(Chart):
         count = 1
         last_point = [self.radius, 0]
         arc = 0 #draw the short arc by default
+        debug = log.isEnabledFor(logging.DEBUG)
+        c = self.coord
         for series in self.data:
             for point in series:
                 angle = (point[1] / float(self.total)) * 360
@@ -155,8 +356,8 @@ class Pie(Chart):
                 else: arc = 0
                 percent = (point[1] / float(self.total)) * 100
                 if math.floor(percent) == percent: percent = int(percent)
-                point1 = "M %s,%s " % (self.x_origin, self.y_origin)
-                point2 = "l %s,%s " % (last_point[0], -last_point[1])
+                point1 = "M %s,%s " % (c(self.x_origin), c(self.y_origin))
+                point2 = "l %s,%s " % (c(last_point[0]), c(-last_point[1]))
 
                 x = math.cos(math.radians(total_angle)) * self.radius
                 y = math.sin(math.radians(total_angle)) * self.radius
@@ -165,23 +366,23 @@ class Pie(Chart):
                 if angle > 3: 
                     total_label_angle = total_angle - (angle / 2)
                    
-                print "label angle %s" % angle
+                if debug: log.debug("label angle %s", angle)
                 label_radius = self.radius + 5
                 x_label = (math.cos(math.radians(total_label_angle)) * label_radius) + self.x_origin # plus the origin x pos shifts label position to pie
                 y_label = self.y_origin - int(math.sin(math.radians(total_label_angle)) * label_radius)
                 
-                point3 = "a%s,%s 0 %s,0 %s,%s z" % (self.radius, self.radius, arc, (x - last_point[0]), -(y - last_point[1]))
+                point3 = "a%s,%s 0 %s,0 %s,%s z" % (c(self.radius), c(self.radius), arc, c(x - last_point[0]), c(-(y - last_point[1])))
                               
                 self.add_label(x_label, y_label, point[0], percent) 
                 last_point = [x, y]
-                path = ET.Element("path", d="%s %s %s" % (point1, point2, point3))
+                path = self.element("path", d="%s %s %s" % (point1, point2, point3))
                 path.attrib['class'] = 'slice-%s' % count
                 self.svg.append(path)
                 count += 1
    
     def add_label(self, x, y, label_text, percent):
 
-        label = ET.Element("text", x="%d" % x, y="%d" % y)
+        label = self.element("text", x="%d" % x, y="%d" % y)
         if x < self.x_origin:
             label.attrib['class'] = 'pie-label-left'
         else:
@@ -192,12 +393,10 @@ class Pie(Chart):
         else: pct_text = "%s" % int(round(percent)) + "%" + " - "
         
         lines = str(label_text).split("\n")
-        height = (len(lines) - 1) * 15
-        label.y = y + height
         #when there's a line break, our extra padding below doesn't work right -- FIX
         lines.reverse()
         for l in lines:
-            elem = ET.Element("tspan", dy="15", x="%s" % x)
+            elem = self.element("tspan", dy="15", x=self.coord(x))
             if l == lines[0]:
                 elem.text = pct_text + l 
                 elem.attrib['dy'] = "0"
@@ -220,12 +419,24 @@ class GridChart(Chart):
         self.y_label_padding = 5
         self.y_label_height = 15
         self.label_intervals = 1
+        self.x_label_ticks = 5
+        self.merge_bars = False #draw each series' bars as one path, see start_bars
+        self.bar_label_spacing = 40 #least pixels between a merged series' value labels, None for no labels
         
         super(GridChart, self).__init__(height, width, data, stylesheet, **kwargs)
         #Catch passed in keyword argument overrides of defaults
         for key in kwargs:
             self.__dict__[key] = kwargs[key] 
 
+    def setup_layout(self):
+
+        #set_scale may widen x_padding and the gridline count is replaced by
+        #the number of ticks found, so keep what was asked for in case the
+        #layout is worked out again for new data
+        if not hasattr(self, '_requested_layout'):
+            self._requested_layout = (self.x_padding, getattr(self, 'gridlines', 5))
+        self.x_padding, self.gridlines = self._requested_layout
+
         #set the baseline coordinates of the actual grid
         self.grid_y1_position = self.padding
         self.grid_y2_position = self.height - self.x_label_height - self.padding - self.y_padding
@@ -242,48 +453,106 @@ class GridChart(Chart):
             self.min_y_value = self.find_y_minimum()
 
         self.max_x_value = max(self.labels)
-        self.max_data_points = len(self.labels)
-        if not hasattr(self, 'gridlines'):
-            self.gridlines = 5
+        if self.sparse_axis:
+            #one slot per x_unit between the smallest and largest label
+            self.max_data_points = self.label_offset_of(self.max_x_value) + 1
+        else:
+            self.max_data_points = len(self.labels)
         
         self.gridline_values = nice.nice_ticks_seq(self.min_y_value, self.max_y_value, self.gridlines, False)
         self.gridlines = len(self.gridline_values) - 1
         self.min_y_axis_value = min(self.gridline_values)
         self.max_y_axis_value = max(self.gridline_values)
         self.y_scale = self.grid_height / float(self.max_y_axis_value - self.min_y_axis_value) #HERE
-        print "min y axis: %s , max_y axis: %s " % ( self.min_y_axis_value, self.max_y_axis_value )
-        print "y scale: %s" % self.y_scale
+        log.debug("min y axis: %s , max_y axis: %s ", self.min_y_axis_value, self.max_y_axis_value)
+        log.debug("y scale: %s", self.y_scale)
         self.y_display_unit = self.get_display_unit()
-        
+
+    def axis_range(self):
+        """ The lowest and highest value on the y axis """
+        self.layout()
+        return (self.min_y_axis_value, self.max_y_axis_value)
+
+    def draw(self):
+        with timed(self, 'setup_chart'):
+            self.setup_chart()
+        self.draw_data()
+
+    def draw_data(self):
+        """
+            Add everything that depends on the data rather than the axis
+            range: the series and the x axis labels and notches
+        """
+        #Chart subclass should have this method to chart the data series
+        with timed(self, 'data_series'):
+            self.data_series()
+        #self.labels.sort() # Yikes! sorting the labels independently from the data leads to problems... 
+        with timed(self, 'set_labels'):
+            self.set_labels()
+
+    def update_data(self, data):
+        """
+            Replace the chart's data. Once the chart has been rendered, its
+            background and axes are kept: only the series and x labels are
+            drawn again, plus the y axis if the new data changes its ticks
+        """
+        if self._svg is None:
+            return super(GridChart, self).update_data(data)
+
+        y_ticks = (self.gridline_values, self.y_display_unit)
+        self.data = columnar(data)
+        self.number_of_series = len(self.data)
+        self.data_stats = None
+        self._laid_out = False
+        try:
+            self.layout()
+            if (self.gridline_values, self.y_display_unit) != y_ticks:
+                self.grid[self._y_axis_index] = self.y_axis()
+            del self.grid[self._data_index:]
+            self.draw_data()
+        except:
+            self._svg = None
+            raise
 
     def setup_chart(self):
 
         #setup background color
-        self.svg.append(ET.Element("rect", x="0", y="0", height="%s" % self.height, width="%s" % self.width, fill="white"))
-        self.grid = ET.Element("g", id="grid", transform="translate(%s, %s)" % (self.grid_x1_position, self.grid_y1_position))
+        self.svg.append(self.element("rect", x="0", y="0", height="%s" % self.height, width="%s" % self.width, fill="white"))
+        self.grid = self.element("g", id="grid", transform="translate(%s, %s)" % (self.grid_x1_position, self.grid_y1_position))
         self.svg.append(self.grid)
 
         #add x and y axes
-        x_axis, y_axis = [ET.Element("g", id="x_axis"), ET.Element("g", id="y_axis")]
-        x_axis.attrib['class'], y_axis.attrib['class'] = ['x-axis', 'y-axis']
+        x_axis = self.element("g", id="x_axis")
+        x_axis.attrib['class'] = 'x-axis'
 
-        x_axis_path = ET.Element("path", d="M %d %d L %d %d" % (0, self.grid_height, self.grid_width, self.grid_height))
+        x_axis_path = self.element("path", d="M %d %d L %d %d" % (0, self.grid_height, self.grid_width, self.grid_height))
         x_axis_path.attrib['class'] = 'x-axis-path'
 
         x_axis.append(x_axis_path)
 
-        y_axis_path = ET.Element("path", d="M %d %d L %d %d" % (0, self.grid_height, 0, 0))
-        y_axis_path.attrib['class'] = 'y-axis-path'
-        
-        notch1 = ET.Element("path", d="M %d %d, L %d %d" % (0, self.grid_height, 0, self.grid_height + 10))
-        notch2 = ET.Element("path", d="M %d %d, L %d %d" % (self.grid_width, self.grid_height, self.grid_width, self.grid_height + 10))
+        notch1 = self.element("path", d="M %d %d, L %d %d" % (0, self.grid_height, 0, self.grid_height + 10))
+        notch2 = self.element("path", d="M %d %d, L %d %d" % (self.grid_width, self.grid_height, self.grid_width, self.grid_height + 10))
         notch1.attrib['class'] = 'x-notch-left'
         notch2.attrib['class'] = 'x-notch-right'
         x_axis.append(notch1)
         x_axis.append(notch2)
+
+        self.grid.append(x_axis)
+        self._y_axis_index = len(self.grid)
+        self.grid.append(self.y_axis())
+        #everything from here on is redrawn by update_data
+        self._data_index = len(self.grid)
+
+    def y_axis(self):
+        """ The y axis group: its paths, and a gridline and label for each tick """
+        y_axis = self.element("g", id="y_axis")
+        y_axis.attrib['class'] = 'y-axis'
+
+        y_axis_path = self.element("path", d="M %d %d L %d %d" % (0, self.grid_height, 0, 0))
+        y_axis_path.attrib['class'] = 'y-axis-path'
         y_axis.append(y_axis_path)
         
-        y_axis_path2 = ET.Element("path", d="M %d %d L %d %d" % (self.grid_width, self.grid_height, self.grid_width, 0))    
+        y_axis_path2 = self.element("path", d="M %d %d L %d %d" % (self.grid_width, self.grid_height, self.grid_width, 0))    
         y_axis_path2.attrib['class'] = 'y-axis-path-2'
         y_axis.append(y_axis_path2)
 
@@ -293,12 +562,12 @@ class GridChart(Chart):
         count = 0
         for label in self.gridline_values:
             #draw the gridline
-            gridline = ET.Element("path", d="M %d %d L %d %d" % (0, (self.grid_height - count * grid_space), self.grid_width, (self.grid_height - count * grid_space)))
+            gridline = self.element("path", d="M %d %d L %d %d" % (0, (self.grid_height - count * grid_space), self.grid_width, (self.grid_height - count * grid_space)))
             gridline.attrib['class'] = 'y-gridline'
             y_axis.append(gridline)
 
             #draw the text label
-            gridline_label = ET.Element("text", x="%s" % (-self.y_label_padding), y="%s" % ( self.grid_height - (count * grid_space) ) )
+            gridline_label = self.element("text", x=self.coord(-self.y_label_padding), y=self.coord(self.grid_height - (count * grid_space)))
             #um = self.max_y_axis_value - (count * grid_value_increment)
             text = "%s" % label
             text = self.convert_units(label)
@@ -308,8 +577,79 @@ class GridChart(Chart):
             y_axis.append(gridline_label)
             count += 1
 
-        self.grid.append(x_axis)
-        self.grid.append(y_axis)
+        return y_axis
+
+    def index_labels(self):
+        """
+            Precompute the slot of every x label and the x offset of every slot,
+            so series loops can place a point with two lookups instead of a
+            search through the label list
+        """
+        self.label_index = dict((label, slot) for slot, label in enumerate(self.labels))
+        if self.sparse_axis:
+            self.x_positions = [self.slot_position(self.label_offset_of(label)) for label in self.labels]
+        else:
+            self.x_positions = [self.slot_position(slot) for slot in xrange(len(self.labels))]
+        self._slot_table = None #the labels and x offsets as arrays for coordinates.py, made when first needed
+
+    def bar_points(self, series):
+        """
+            (label, value, slot, height) for each point of a series: the slot
+            of its label and its value's height in pixels, or None for a
+            value that isn't a number
+        """
+        placed = coordinates.place(self, series)
+        if placed is not None:
+            return coordinates.bar_points(self, placed)
+        label_index = self.label_index
+        y_scale = self.y_scale
+        min_y_axis_value = self.min_y_axis_value
+        return [(point[0], point[1], label_index[point[0]],
+                 y_scale * (point[1] - min_y_axis_value) if isinstance(point[1], (int, long, float, complex)) else None)
+                for point in series]
+
+    def x_position_of(self, label):
+        """ The x offset of any label within the axis' range, whether or not the data has it """
+        if self.sparse_axis:
+            return self.slot_position(self.label_offset_of(label))
+        return self.slot_position(label - self.labels[0])
+
+    def label_offset_of(self, label):
+        """ Position of a numeric label on a sparse axis, in slots from the first label """
+        if self.time_axis:
+            label = seconds_since_epoch(label)
+        return (label - self.x_origin) / float(self.x_unit)
+
+    def x_axis_labels(self):
+        """
+            The (slot, label) pairs to draw along the x axis. A sparse axis
+            gets nice ticks across its range instead of one label per value
+        """
+        if not self.sparse_axis:
+            return list(enumerate(self.labels))
+        if self.time_axis:
+            return self.time_axis_labels()
+        ticks = nice.nice_ticks_seq(self.labels[0], self.max_x_value, self.x_label_ticks, True)
+        return [(self.label_offset_of(t), int(t) if t == int(t) else t) for t in ticks]
+
+    def time_axis_labels(self):
+        """ (slot, label) pairs for nicely spaced times across a time axis """
+        lo, hi = as_datetime(self.labels[0]), as_datetime(self.max_x_value)
+        ticks = [lo]
+        if lo != hi:
+            #the calendar tick search rounds badly inward, so round outward and drop the ticks past the data
+            ticks = [t for t in nice.nice_time_ticks_seq(lo, hi, self.x_label_ticks, False) if lo <= t <= hi] or ticks
+        time_format = self.time_format
+        if time_format is None:
+            step = 0
+            if len(ticks) > 1:
+                step = seconds_since_epoch(ticks[1]) - seconds_since_epoch(ticks[0])
+            for least_step, time_format in TIME_FORMATS:
+                if step >= least_step:
+                    break
+            if step < 86400 and ticks[0].date() != ticks[-1].date():
+                time_format = '%b %d ' + time_format
+        return [(self.label_offset_of(t), t.strftime(time_format)) for t in ticks]
 
     def check_label_types(self):
 
@@ -318,17 +658,78 @@ class GridChart(Chart):
         #START HERE    
 
     def data_point_label(self, value, x, y):
-        dp_label = ET.Element("text", x="%s" % x, y="%s" % y)
+        dp_label = self.element("text", x=self.coord(x), y=self.coord(y))
         text = str(value)
         text = self.convert_units(value)
         dp_label.text = "%s" % text
         dp_label.attrib['class'] = 'data-point-label'
         self.grid.append(dp_label)
 
+    def start_bars(self):
+        """
+            Get ready for add_bar, add_notch and add_bar_label. With
+            merge_bars, the bars of each series are collected as subpaths of
+            a single path, the notches likewise, and value labels are thinned
+            to one per bar_label_spacing pixels; finish_bars draws them all
+        """
+        if self.merge_bars:
+            self._bar_paths = {}
+            self._notch_paths = []
+            self._bar_labels = []
+            self._last_label_x = {}
+        else:
+            self._bar_paths = None
+
+    def add_bar(self, x, y, height, series_count):
+        if self._bar_paths is not None:
+            self._bar_paths.setdefault(series_count, []).append(rect_path(x, y, self.x_scale, height, self.coord))
+            return
+        c = self.coord
+        data_point = self.element("rect", x=c(x), y=c(y), height=c(height), width=c(self.x_scale))
+        data_point.attrib['class'] = 'series-%s-point' % series_count
+        self.grid.append(data_point)
+
+    def add_notch(self, x):
+        c = self.coord
+        notch_y_pos = self.grid_height
+        if self._bar_paths is not None:
+            self._notch_paths.append("M%s %sv5" % (c(x), c(notch_y_pos)))
+            return
+        notch = self.element("path", d="M %s %s L %s %s" % (c(x), c(notch_y_pos), c(x), c(notch_y_pos + 5)))
+        notch.attrib['class'] = 'x-notch'
+        self.grid.append(notch)
+
+    def add_bar_label(self, value, x, y, series_count):
+        if self._bar_paths is None:
+            self.data_point_label(value, x, y)
+            return
+        if self.bar_label_spacing is None:
+            return
+        last_x = self._last_label_x.get(series_count)
+        if last_x is None or abs(x - last_x) >= self.bar_label_spacing:
+            self._last_label_x[series_count] = x
+            self._bar_labels.append((value, x, y))
+
+    def finish_bars(self):
+        """ Draw the bars, notches and labels held back by merge_bars """
+        if self._bar_paths is None:
+            return
+        for series_count in sorted(self._bar_paths):
+            bars = self.element("path", d="".join(self._bar_paths[series_count]))
+            bars.attrib['class'] = 'series-%s-point' % series_count
+            self.grid.append(bars)
+        if self._notch_paths:
+            notches = self.element("path", d="".join(self._notch_paths))
+            notches.attrib['class'] = 'x-notch'
+            self.grid.append(notches)
+        for value, x, y in self._bar_labels:
+            self.data_point_label(value, x, y)
+        self._bar_paths = None
+
     def get_display_unit(self):
 #need to change this to be for tick marks, not actual data points
         if self.min_y_axis_value != 0:
-            print self.min_y_axis_value
+            log.debug("display unit from min y axis value %s", self.min_y_axis_value)
             return self.match_unit(self.min_y_axis_value)
         else:
             return self.match_unit(self.gridline_values[1])
@@ -364,49 +765,101 @@ class Line(GridChart):
 
     def __init__(self, height, width, data, stylesheet=None, *args, **kwargs):
 
+        self.downsample = None
+        self.max_points = None
+        self.compact_paths = False #write series paths as relative moves, see paths.py
+
         super(Line, self).__init__(height, width, data, stylesheet, **kwargs)
+
+    def single_pass(self):
+        if self.x_range is None or self.y_range is None:
+            return False
+        #text labels are placed by their slot in the data, so it has to be read first
+        return not [label for label in self.x_range if isinstance(label, basestring)]
+
+    def setup_layout(self):
+        super(Line, self).setup_layout()
        
         self.x_scale = self.set_scale()  #find the width of each point in each series
         self.x_group_scale = self.x_scale * self.number_of_series  #width of each data point grouping over multiple series
-        self.setup_chart()
-
-        self.data_series()  #Chart subclass should have this method to chart the data series
-        #self.labels.sort() # Yikes! sorting the labels independently from the data leads to problems... 
-        self.set_labels()
+        self.index_labels()
          
     def set_scale(self):
         #pixels between data points
-        return float(self.grid_width - (self.x_padding * 2) ) / (len(self.labels) - 1) 
+        return float(self.grid_width - (self.x_padding * 2) ) / (self.max_data_points - 1) 
+
+    def slot_position(self, slot):
+        return self.x_padding + int(slot * self.x_scale)
+
+    def point_budget(self):
+        """
+            How many vertices each series' path may have: max_points if given,
+            otherwise about one per pixel of grid width when downsampling
+        """
+        if self.max_points:
+            return int(self.max_points)
+        if self.downsample:
+            return int(self.grid_width)
+        return None
+
+    def series_points(self, series):
+        """
+            The pixel coordinates of each point in a series, reduced to the
+            point budget with the chosen downsample method ('lttb' or 'minmax').
+            When the chart draws in a single pass, the series is only read as
+            the points are asked for
+        """
+        grid_height = self.grid_height
+        min_y_axis_value = self.min_y_axis_value
+        y_scale = self.y_scale
+        if self.single_pass():
+            #the series may be an iterator, and its labels aren't in label_index
+            x_position_of = self.x_position_of
+            points = ((x_position_of(point[0]), grid_height - (y_scale * (point[1] - min_y_axis_value))) for point in series)
+        else:
+            placed = coordinates.place(self, series)
+            if placed is not None:
+                points = coordinates.line_points(self, placed)
+            else:
+                label_index = self.label_index
+                x_positions = self.x_positions
+                points = [(x_positions[label_index[point[0]]], grid_height - (y_scale * (point[1] - min_y_axis_value))) for point in series]
+
+        budget = self.point_budget()
+        if budget:
+            if self.single_pass():
+                points = list(points)
+            points = downsample.get_method(self.downsample or 'lttb')(points, budget)
+        return points
+
+    def series_path(self, series):
+        """ The "x y" vertices of a series' path, joined by " L " """
+        if not self.point_budget() and not self.single_pass():
+            placed = coordinates.place(self, series)
+            if placed is not None:
+                return coordinates.line_path(self, placed)
+        if self.precision is not None:
+            c = self.coord
+            return " L ".join(["%s %s" % (c(x), c(y)) for x, y in self.series_points(series)])
+        return " L ".join(["%s %s" % point for point in self.series_points(series)])
 
     def data_series(self):
         
         series_count = 0
         left_offset = self.padding  
         bottom_offset = self.padding
-        g_container = ET.Element('g')
+        g_container = self.element('g')
         
         for series in self.data:
             series_count += 1
             if series != 'placeholder':
-                #move path to initial data point
-                data_point_count = self.labels.index(series[0][0])
-                path_string = "M %s %s" % (self.x_padding + int(data_point_count * self.x_scale), self.grid_height - ((series[0][1] - self.min_y_axis_value) * self.y_scale))
-
-                for point in series:
-                    if data_point_count == 0: 
-                        data_point_count += 1
-                        continue
-
-                    data_point_count = self.labels.index(point[0]) 
-                    path_string += " L "
-                    x = self.x_padding + int(data_point_count * self.x_scale)
-                    point_height = self.y_scale * (point[1] - self.min_y_axis_value)
-                    y = self.grid_height - point_height
-                    path_string += "%s %s" % (x, y)
-                    data_point_count += 1
-                    #put point markers in here at some point?
-
-                line = ET.Element("path", d=path_string)
+                #move path to initial data point, then draw to each of the others
+                #put point markers in here at some point?
+                if self.compact_paths:
+                    d = compact_path(self.series_points(series), self.precision)
+                else:
+                    d = "M " + self.series_path(series)
+                line = self.element("path", d=d)
                 line.attrib['class'] = 'series-%s-line' % series_count
                 g_container.append(line)
         self.grid.append(g_container)
@@ -422,28 +875,35 @@ class Line(GridChart):
                 notch_start = 0
                 label_start = self.label_offset
 
-        for l in self.labels:
+        axis_labels = self.x_axis_labels()
+        last_label = axis_labels[-1][1]
+        if len(axis_labels) > 1:
+            label_step = axis_labels[1][0] - axis_labels[0][0]
+        else:
+            label_step = 1
+
+        for slot, l in axis_labels:
 
-            x_position = self.x_padding + (label_count * self.x_scale)
+            x_position = self.x_padding + (slot * self.x_scale)
             y_position = self.grid_height + self.x_label_padding
             
             if  (self.label_intervals and (label_count >= label_start) and (label_count - label_start) % self.label_intervals == 0) or not self.label_intervals:
-                text_item = ET.Element("text")
-                text_item.attrib['x'] = "%s" % x_position
-                text_item.attrib['y'] = "%s" % y_position
+                text_item = self.element("text")
+                text_item.attrib['x'] = self.coord(x_position)
+                text_item.attrib['y'] = self.coord(y_position)
                 text_item.text = "%s" % l
                 text_item.attrib['class'] = 'x-axis-label'
                 self.grid.append(text_item)
                 
                 #insert the notch between data point groups
-                if l != self.labels[-1]:
+                if l != last_label:
                     if self.label_intervals:
                         skip_labels = self.label_intervals
                     else: skip_labels = 1
 
-                    notch_x_pos = x_position + (((self.x_padding + ((label_count + skip_labels) * self.x_scale)) - x_position) / 2)
+                    notch_x_pos = x_position + (((self.x_padding + ((slot + skip_labels * label_step) * self.x_scale)) - x_position) / 2)
                     notch_y_pos = self.grid_height
-                    notch = ET.Element("path", d="M %s %s L %s %s" % (notch_x_pos, notch_y_pos, notch_x_pos, notch_y_pos + 5))
+                    notch = self.element("path", d="M %s %s L %s %s" % (self.coord(notch_x_pos), self.coord(notch_y_pos), self.coord(notch_x_pos), self.coord(notch_y_pos + 5)))
                     notch.attrib['class'] = 'x-notch'
                     self.grid.append(notch)
             label_count += 1
@@ -453,21 +913,19 @@ class Column(GridChart):
     
     def __init__(self, height, width, data, stylesheet=None, *args, **kwargs):
 
+        self.max_x_point_width = 30  #How wide should a bar chart be if there's plenty of white space -->move to bar chart only
+
         super(Column, self).__init__(height, width, data, stylesheet, **kwargs)
 
-        self.max_x_point_width = 30  #How wide should a bar chart be if there's plenty of white space -->move to bar chart only
+    def setup_layout(self):
+        super(Column, self).setup_layout()
 
         #find the width of each point in each series
         self.x_scale = self.set_scale()
         
         #width of each data point grouping over multiple series
         self.x_group_scale = self.x_scale * self.number_of_series
-        self.setup_chart()
-
-        #Chart subclass should have this method to chart the data series
-        self.data_series()
-        #self.labels.sort() # Yikes! sorting the labels independently from the data leads to problems... 
-        self.set_labels()
+        self.index_labels()
          
 
     def set_scale(self):
@@ -480,29 +938,36 @@ class Column(GridChart):
         else:
             return scale
 
+    def slot_position(self, slot):
+        return (self.x_padding / 2) + (slot * (self.x_group_scale + self.x_padding))
+
     def data_series(self):
 
         series_count = 0
         left_offset = self.padding  
         bottom_offset = self.padding
+        x_positions = self.x_positions
+        self.start_bars()
         
         for series in self.data:
             data_point_count = 0
-            for point in series:
-                data_point_count = self.labels.index(point[0])
+            is_last_series = series == self.data[-1]
+            if is_last_series and len(series):
+                last_point = tuple(series[-1])
+            for point in self.bar_points(series):
+                data_point_count = point[2]
                 point_width = self.x_scale
-                x_position = (self.x_padding / 2) + (data_point_count * (self.x_group_scale + self.x_padding) ) + (series_count * point_width)
+                x_position = x_positions[data_point_count] + (series_count * point_width)
 
-                if isinstance(point[1], (int, long, float, complex)):
-                    point_height = self.y_scale * (point[1] - self.min_y_axis_value)
-                else:
+                point_height = point[3]
+                if point_height is None:
                     #value may be a string to display
                     point_height = self.max_y_axis_value * self.y_scale
-                    text = ET.Element("text", x="%s" % x_position, y="%s" % (self.grid_height - (point_height/2)))
+                    text = self.element("text", x=self.coord(x_position), y=self.coord(self.grid_height - (point_height/2)))
                     words = point[1].split('\n')
                     num_words = 0
                     for w in words:
-                        text_span = ET.Element("tspan", x="%s" % x_position, y="%s" % (self.grid_height - ((len(words) * 14) - (num_words * 14) ) ))  
+                        text_span = self.element("tspan", x=self.coord(x_position), y=self.coord(self.grid_height - ((len(words) * 14) - (num_words * 14))))
                         text_span.text = w
                         text.append(text_span)
                         num_words += 1
@@ -513,28 +978,33 @@ class Column(GridChart):
                     continue
                 
                 y_position = (self.grid_height - point_height)
-                data_point = ET.Element("rect", x="%s" % x_position, y="%s" % y_position, height="%s" % point_height, width="%s" % point_width  )
-                data_point.attrib['class'] = 'series-%s-point' % series_count
 
                 #insert the notch between data point groups
-                if series == self.data[-1] and point != series[-1]:
+                notch_x_pos = None
+                if is_last_series and point[:2] != last_point:
                     notch_x_pos = x_position + (point_width) + (self.x_padding / 2)
-                    notch_y_pos = self.grid_height
-                    notch = ET.Element("path", d="M %s %s L %s %s" % (notch_x_pos, notch_y_pos, notch_x_pos, notch_y_pos + 5))
-                    notch.attrib['class'] = 'x-notch'
-                    self.grid.append(notch)
-            
-                self.grid.append(data_point)
-                self.data_point_label(point[1], x_position + (point_width / 2), y_position - 5)
+
+                self.draw_bar(x_position, y_position, point_height, point[1], x_position + (point_width / 2), y_position - 5, notch_x_pos, series_count)
                 data_point_count += 1
 
             series_count += 1
+        self.finish_bars()
+
+    def draw_bar(self, x, y, height, value, label_x, label_y, notch_x, series_count):
+        """
+            Append one bar with its value label, preceded by the notch after
+            it when notch_x is given
+        """
+        if notch_x is not None:
+            self.add_notch(notch_x)
+        self.add_bar(x, y, height, series_count)
+        self.add_bar_label(value, label_x, label_y, series_count)
 
 
-    def add_label(self, label, label_count, word_count=0):
-            x_position = int((self.x_padding / 2) + (self.x_group_scale / 2) + (label_count * (self.x_group_scale + self.x_padding)))
+    def add_label(self, label, slot, word_count=0):
+            x_position = int(self.slot_position(slot) + (self.x_group_scale / 2))
             y_position = self.grid_height + self.x_label_padding + (13 * word_count)
-            text_item = ET.Element("text", x="%s" % x_position, y="%s" % y_position)
+            text_item = self.element("text", x=self.coord(x_position), y=self.coord(y_position))
             text_item.text = "%s" % label
             text_item.attrib['class'] = 'x-axis-label'
             if self.label_rotate:
@@ -546,21 +1016,18 @@ class Column(GridChart):
             self.grid.append(text_item)
 
     def set_labels(self):
-        label_count = 0
-        for l in self.labels:
+        for slot, l in self.x_axis_labels():
             if not self.numeric_labels:
                 if len(l.split('\n')):
                     #multiline label
                     word_count = 0
                     for word in l.split('\n'):
-                        self.add_label(word, label_count, word_count)
+                        self.add_label(word, slot, word_count)
                         word_count += 1
                 else:
-                    self.add_label(l, label_count)
+                    self.add_label(l, slot)
             else:
-                self.add_label(l, label_count)
-
-            label_count += 1
+                self.add_label(l, slot)
 
 
 class StackedColumn(GridChart):
@@ -568,36 +1035,47 @@ class StackedColumn(GridChart):
     
     def __init__(self, height, width, data, stylesheet=None, *args, **kwargs):
 
+        self.max_x_point_width = 60  #How wide should a bar chart be if there's plenty of white space -->move to bar chart only
+
         super(StackedColumn, self).__init__(height, width, data, stylesheet, **kwargs)
 
-        self.max_x_point_width = 60  #How wide should a bar chart be if there's plenty of white space -->move to bar chart only
+    def setup_layout(self):
+        super(StackedColumn, self).setup_layout()
 
         #find the width of each point in each series
         self.x_group_scale = self.set_group_scale()
         self.x_scale = self.set_scale()
         #width of each data point grouping over multiple series
-        self.setup_chart()
+        self.index_labels()
 
-        #Chart subclass should have this method to chart the data series
-        self.data_series()
-        
-        self.set_labels()
+    def draw_data(self):
+        super(StackedColumn, self).draw_data()
+        with timed(self, 'set_notches'):
+            self.set_notches()
+
+    def set_notches(self):
         
-        #insert the notch between data point groups
+        #insert the notch between data point groups, halfway across the padding before each
         lcount = 0
-        for l in self.labels: 
-            if lcount == 0:
-                notch_x_pos = 0
-            else:
-                notch_x_pos = self.x_padding + (lcount * self.x_group_scale)
+        merged = []
+        for slot_x in self.x_positions:
+            notch_x_pos = slot_x - (self.x_padding / 2)
             notch_y_pos = self.grid_height
-            notch = ET.Element("path", d="M %s %s L %s %s" % (notch_x_pos, notch_y_pos, notch_x_pos, notch_y_pos + 5))
+            if lcount and self.merge_bars:
+                merged.append("M%s %sv5" % (self.coord(notch_x_pos), self.coord(notch_y_pos)))
+                lcount += 1
+                continue
+            notch = self.element("path", d="M %s %s L %s %s" % (self.coord(notch_x_pos), self.coord(notch_y_pos), self.coord(notch_x_pos), self.coord(notch_y_pos + 5)))
             if lcount == 0: notch.attrib['class'] = 'x-notch-left'
             else: notch.attrib['class'] = 'x-notch'
             self.grid.append(notch)
             lcount += 1
+        if merged:
+            notches = self.element("path", d="".join(merged))
+            notches.attrib['class'] = 'x-notch'
+            self.grid.append(notches)
 
-        end_notch = ET.Element("path", d="M %s %s L %s %s" % (self.grid_width, self.grid_height, self.grid_width, self.grid_height + 5))
+        end_notch = self.element("path", d="M %s %s L %s %s" % (self.coord(self.grid_width), self.coord(self.grid_height), self.coord(self.grid_width), self.coord(self.grid_height + 5)))
         end_notch.attrib['class'] = 'x-notch-right'
         self.grid.append(end_notch)
     
@@ -609,50 +1087,42 @@ class StackedColumn(GridChart):
         else: return self.x_group_scale
 
     def set_group_scale(self):
-        return (self.grid_width - (self.x_padding * 2)) / len(self.labels)
+        return (self.grid_width - (self.x_padding * 2)) / self.max_data_points
+
+    def slot_position(self, slot):
+        return (self.x_padding / 2) + (slot * (self.x_group_scale + self.x_padding))
     
     def find_y_maximum(self):
-        total_per_label = {}
-
-        for series in self.data:
-            #because values are additive for each label, need to add them up to find the max and scale appropriately
-            for point in series:
-                if total_per_label.has_key(point[0]):
-                    total_per_label[point[0]] += int(point[1])
-                else:
-                    total_per_label[point[0]] = int(point[1])
-                
-        return max(total_per_label.values())
+        #because values are additive for each label, the tallest stack sets the scale
+        return max(self.stats.stack_totals.values())
     
     def data_series(self):
 
         series_count = 0
-        height_offset = {}
-        totals = {}
+        height_offset = [0] * len(self.labels)
+        totals = self.stats.stack_totals
+        x_positions = self.x_positions
+        self.start_bars()
          
         for series in self.data:
 
-            point_count = 0 
-            for point in series:
+            is_last_series = series == self.data[-1]
+            for point in self.bar_points(series):
                 point_width = self.x_scale
-                x_position = (self.x_padding / 2) + (point_count * (self.x_group_scale + self.x_padding)) + ((self.x_group_scale - self.x_scale) / 2)
-
-                if isinstance(point[1], (int, long, float, complex)):
-                    point_height = self.y_scale * (point[1] - self.min_y_axis_value)
-                    if totals.has_key(point[0]):
-                        totals[point[0]] += point[1]
-                    else:
-                        totals[point[0]] = point[1]
-                else:
+                slot = point[2]
+                x_position = x_positions[slot] + ((self.x_group_scale - self.x_scale) / 2)
+
+                point_height = point[3]
+                if point_height is None:
                     
                     #value may be a string to display
                     point_height = self.max_y_axis_value * self.y_scale
-                    text = ET.Element("text", x="%s" % x_position, y="%s" % (self.grid_height - (point_height/2)))
+                    text = self.element("text", x=self.coord(x_position), y=self.coord(self.grid_height - (point_height/2)))
                     words = point[1].split(' ')
                     num_words = 0
                     
                     for w in words:
-                        text_span = ET.Element("tspan", x="%s" % x_position, y="%s" % (self.grid_height - ((len(words) * 14) - (num_words * 14) ) ))  
+                        text_span = self.element("tspan", x=self.coord(x_position), y=self.coord(self.grid_height - ((len(words) * 14) - (num_words * 14))))
                         text_span.text = w
                         text.append(text_span)
                         num_words += 1
@@ -664,29 +1134,28 @@ class StackedColumn(GridChart):
                     
 #                y_position = (self.grid_height - point_height)
                 
-                if height_offset.has_key(point[0]):
-                    y_position = self.grid_height - ( height_offset[point[0]] + point_height )
-                    height_offset[point[0]] += point_height
-                else:
-                    y_position = self.grid_height - point_height
-                    height_offset[point[0]] = point_height
+                y_position = self.grid_height - ( height_offset[slot] + point_height )
+                height_offset[slot] += point_height
 
-                data_point = ET.Element("rect", x="%s" % x_position, y="%s" % y_position, height="%s" % point_height, width="%s" % point_width  )
-                data_point.attrib['class'] = 'series-%s-point' % series_count
-
-                self.grid.append(data_point)
-                if series == self.data[-1]:
-                    self.data_point_label(totals[point[0]], x_position + (point_width / 2), y_position - 5)
-
-                point_count += 1
+                total = None
+                if is_last_series:
+                    total = totals[point[0]]
+                self.draw_bar(x_position, y_position, point_height, total, x_position + (point_width / 2), y_position - 5, series_count)
                     
             series_count += 1
+        self.finish_bars()
+
+    def draw_bar(self, x, y, height, total, label_x, label_y, series_count):
+        """ Append one bar, labelled with the stack's total if one is given """
+        self.add_bar(x, y, height, series_count)
+        if total is not None:
+            self.add_bar_label(total, label_x, label_y, series_count)
 
 
-    def add_label(self, label, label_count, word_count=0):
-            x_position = int((self.x_padding / 2) + (self.x_group_scale / 2) + (label_count * (self.x_group_scale + self.x_padding)))
+    def add_label(self, label, slot, word_count=0):
+            x_position = int(self.slot_position(slot) + (self.x_group_scale / 2))
             y_position = self.grid_height + self.x_label_padding + (13 * word_count)
-            text_item = ET.Element("text", x="%s" % x_position, y="%s" % y_position)
+            text_item = self.element("text", x=self.coord(x_position), y=self.coord(y_position))
             text_item.text = "%s" % label
             text_item.attrib['class'] = 'x-axis-label'
             if self.label_rotate:
@@ -699,26 +1168,135 @@ class StackedColumn(GridChart):
 
 
     def set_labels(self):
-        label_count = 0
-        for l in self.labels:
+        for slot, l in self.x_axis_labels():
             if not self.numeric_labels:
                 if len(l.split('\n')):
                     #multiline label
                     word_count = 0
                     for word in l.split('\n'):
-                        self.add_label(word, label_count, word_count)
+                        self.add_label(word, slot, word_count)
                         word_count += 1
                 else:
-                    self.add_label(l, label_count)
+                    self.add_label(l, slot)
             else:
-                self.add_label(l, label_count)
-
-            label_count += 1
+                self.add_label(l, slot)
 
     def data_point_label(self, value, x, y):
-        dp_label = ET.Element("text", x="%s" % x, y="%s" % y)
+        dp_label = self.element("text", x=self.coord(x), y=self.coord(y))
         text = str(value)
         text = self.convert_units(value)
         dp_label.text = "%s" % text
         dp_label.attrib['class'] = 'data-point-label'
         self.grid.append(dp_label)
+
+
+class Sparkline(GridChart):
+    """A word-sized Line: each series is a single path through evenly spaced
+       points, scaled to fill the chart, with no background, axes, gridlines
+       or labels, and optionally dots marking the series' 'min', 'max' and
+       'last' values. Without a stylesheet the lines and dots are drawn in
+       the surrounding text color.
+    """
+    def __init__(self, height, width, data, stylesheet=None, *args, **kwargs):
+
+        self.markers = () #any of SPARKLINE_MARKERS
+        self.marker_radius = 1.5
+        self.use_zero_minimum = False #start the scale at zero when every value is above it
+
+        super(Sparkline, self).__init__(height, width, data, stylesheet, **kwargs)
+        for marker in self.markers:
+            if marker not in SPARKLINE_MARKERS:
+                raise ValueError("Unknown sparkline marker %r, expected any of %s" % (marker, ', '.join(SPARKLINE_MARKERS)))
+        if 'padding' not in kwargs:
+            self.padding = self.marker_radius if self.markers else 1
+
+    def gather_stats(self):
+        """
+            A single pass over the data for its values and their range;
+            there are no ticks or labels to work out
+        """
+        self.values = [None if series == 'placeholder' else [point[1] for point in series] for series in self.data]
+        self.find_range()
+        return None
+
+    def extract_labels(self):
+        return []
+
+    def find_range(self):
+        min_y = max_y = None
+        longest = 0
+        for values in self.values:
+            if not values:
+                continue
+            lo = min(values)
+            hi = max(values)
+            if min_y is None or lo < min_y:
+                min_y = lo
+            if max_y is None or hi > max_y:
+                max_y = hi
+            longest = max(longest, len(values))
+        self.min_y_value = min_y
+        self.max_y_value = max_y
+        self.max_data_points = longest
+
+    def setup_layout(self):
+        self.grid_x1_position = self.grid_y1_position = self.padding
+        self.grid_width = self.width - (self.padding * 2)
+        self.grid_height = self.height - (self.padding * 2)
+
+        self.min_y_axis_value = self.min_y_value
+        self.max_y_axis_value = self.max_y_value
+        if self.use_zero_minimum and self.min_y_value is not None:
+            self.min_y_axis_value = min(0, self.min_y_value)
+        if self.min_y_axis_value is None or self.max_y_axis_value == self.min_y_axis_value:
+            #a flat line is drawn across the middle
+            self.y_scale = 0
+        else:
+            self.y_scale = self.grid_height / float(self.max_y_axis_value - self.min_y_axis_value)
+        if self.max_data_points > 1:
+            self.x_scale = self.grid_width / float(self.max_data_points - 1)
+        else:
+            self.x_scale = 0
+
+    def update_data(self, data):
+        Chart.update_data(self, data)
+
+    def draw(self):
+        with timed(self, 'data_series'):
+            self.data_series()
+
+    def data_series(self):
+        precision = PATH_PRECISION if self.precision is None else self.precision
+        number = '%%.%df' % precision
+        left = self.grid_x1_position
+        bottom = self.grid_y1_position + self.grid_height
+        if self.y_scale:
+            min_y_axis_value = self.min_y_axis_value
+            y_scale = self.y_scale
+        else:
+            bottom -= self.grid_height / 2.0
+            min_y_axis_value = self.min_y_axis_value or 0
+            y_scale = 0
+        x_scale = self.x_scale
+        svg = self.svg
+        if self.markers:
+            radius = number_formatter(precision)(self.marker_radius)
+            #the dots take their color from the root rather than each saying so
+            svg.set('fill', "currentColor")
+
+        series_count = 0
+        for values in self.values:
+            series_count += 1
+            if not values:
+                continue
+            ys = [bottom - (y_scale * (value - min_y_axis_value)) for value in values]
+            svg.append(self.element("path", {'class': 'series-%s-line' % series_count, 'd': spaced_path(left, x_scale, ys, precision), 'fill': "none", 'stroke': "currentColor"}))
+
+            #the dots sit on the line's points exactly as the path writes them
+            xs = spaced_xs(len(ys), left, x_scale, precision) if self.markers else None
+            for marker in self.markers:
+                if marker == 'last':
+                    i = len(values) - 1
+                else:
+                    i = values.index(min(values) if marker == 'min' else max(values))
+                svg.append(self.element("circle", {'class': marker + '-marker', 'cx': xs[i], 'cy': number % ys[i], 'r': radius}))
@@ -0,0 +1,105 @@
+"""
+Bulk placement of columnar series.
+
+Grid charts place their points one at a time. When NumPy is importable, a
+series given as columns of numbers (see series.py) is placed in one go
+instead: its labels are found among the chart's label slots with a single
+sorted search and its values are scaled to pixels as an array. A Line's path
+is then written by one % operation over the whole series, with each slot's x
+coordinate formatted once per chart rather than once per point.
+
+The output is the same as the per-point loops give: the same floating point
+operations in the same order, coming back as Python numbers formatted as
+usual. Anything that couldn't be placed exactly (lists of points, labels
+that aren't in the slots, integers too big for a double, dates) gets None,
+and the chart places it the usual way.
+"""
+
+from series import Columns
+from stats import _numeric_array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#integers up to this size are the same number as a double
+EXACT_INTEGERS = 2 ** 53
+
+
+def _slot_table(chart):
+    """
+        The chart's labels as a sorted array, with the formatted x position
+        of each slot, built once per layout; None if the labels aren't
+        numbers an array holds exactly
+    """
+    table = chart._slot_table
+    if table is None:
+        table = False
+        if chart.numeric_labels and chart.labels:
+            labels = _numeric_array(numpy.array(chart.labels))
+            if labels is not None and labels.tolist() == chart.labels and (labels[1:] > labels[:-1]).all():
+                table = (labels, numpy.array(map(chart.coord, chart.x_positions), dtype=object))
+        chart._slot_table = table
+    return table or None
+
+
+def _exact(values):
+    """ Whether every number in an array of integers is the same number as a double """
+    return not len(values) or max(abs(int(values.min())), abs(int(values.max()))) < EXACT_INTEGERS
+
+
+def place(chart, series):
+    """
+        The (xs, ys, slots) of a columnar series as arrays: its labels and
+        values, and the index of each label in chart.labels. None if the
+        series has to be placed point by point
+    """
+    if numpy is None or not isinstance(series, Columns):
+        return None
+    if not isinstance(chart.y_scale, float) or abs(chart.min_y_axis_value) >= EXACT_INTEGERS:
+        return None
+    table = _slot_table(chart)
+    xs, ys = _numeric_array(series.xs), _numeric_array(series.ys)
+    if table is None or xs is None or ys is None or not len(ys):
+        return None
+    labels = table[0]
+    if ys.dtype.kind != 'f' and not _exact(ys):
+        return None
+    #labels and xs of different kinds are compared as doubles
+    if xs.dtype.kind != labels.dtype.kind and not ((xs.dtype.kind == 'f' or _exact(xs)) and (labels.dtype.kind == 'f' or _exact(labels))):
+        return None
+    slots = labels.searchsorted(xs).clip(0, len(labels) - 1)
+    if not (labels[slots] == xs).all():
+        return None
+    return xs, ys, slots
+
+
+def heights(chart, ys):
+    """ The height of each value above the bottom of the grid, in pixels """
+    return chart.y_scale * (numpy.asarray(ys, dtype=numpy.float64) - chart.min_y_axis_value)
+
+
+def line_points(chart, placed):
+    """ The (x, y) pixel coordinates of each point of a placed series """
+    xs, ys, slots = placed
+    x_positions = chart.x_positions
+    return zip([x_positions[slot] for slot in slots.tolist()], (chart.grid_height - heights(chart, ys)).tolist())
+
+
+def line_path(chart, placed):
+    """ The "x y" vertices of a placed series, joined by " L " as Line.series_path joins them """
+    xs, ys, slots = placed
+    ys = (chart.grid_height - heights(chart, ys)).tolist()
+    if chart.precision is not None:
+        ys = map(chart.coord, ys)
+    flat = numpy.empty(2 * len(ys), dtype=object)
+    flat[0::2] = _slot_table(chart)[1][slots]
+    flat[1::2] = ys
+    return " L ".join(["%s %s"] * len(ys)) % tuple(flat.tolist())
+
+
+def bar_points(chart, placed):
+    """ (label, value, slot, height) for each point of a placed series, as GridChart.bar_points gives them """
+    xs, ys, slots = placed
+    return zip(xs.tolist(), ys.tolist(), slots.tolist(), heights(chart, ys).tolist())
@@ -0,0 +1,155 @@
+"""
+Several charts in one svg document.
+
+A Dashboard places charts side by side in rows and writes them out as one
+document, each chart in a nested <svg> element of its own size so its
+coordinates are unchanged:
+
+    board = Dashboard(columns=3, spacing=20)
+    for data in datasets:
+        board.add(Line(300, 150, data, 'css/linechart.css'))
+    board.output('dashboard.svg')
+
+Charts are given as chart objects or as specs (see batch.py), and a chart
+can be put at an exact position with add(chart, x, y) instead.
+
+Each stylesheet is emitted once at the top of the document rather than in
+every chart: either the dashboard's own stylesheet, or else each distinct
+stylesheet the charts use. Style rules apply to the whole document, so
+charts sharing a class name (x-axis-label, say) should share its styling
+too. Element ids have to be unique in the document, so each chart's ids are
+written with its frame's prefix (frame0-grid, frame1-grid, ...). The
+charts' trees aren't changed or copied wholesale: only the elements with
+an id, and the groups holding them, are copied into the document, and it
+is serialized in a single pass.
+"""
+
+from charty import Document
+from batch import make_chart
+from nodes import Node
+from stylesheet import get_stylesheet
+
+#attributes of a chart's own document that its frame doesn't take over; anything else on it (a fill, say) applies to the chart's content
+DOCUMENT_ATTRIBUTES = ('xmlns', 'xmlns:svg', 'version', 'height', 'width', 'x', 'y')
+
+
+def _prefix_ids(node, prefix):
+    """
+        node, or if it or anything in it has an id, a copy of it and of
+        each group down to the ids with *prefix* put before every id
+    """
+    children = node[:]
+    changed = False
+    for index, child in enumerate(children):
+        #most elements are childless marks without an id, and are passed over
+        if len(child) or 'id' in child.attrib:
+            new = _prefix_ids(child, prefix)
+            if new is not child:
+                children[index] = new
+                changed = True
+    node_id = node.get('id')
+    if node_id is None and not changed:
+        return node
+    copy = node.__class__(node.tag, dict(node.attrib))
+    copy.text = node.text
+    copy.tail = node.tail
+    if node_id is not None:
+        copy.set('id', prefix + node_id)
+    if children:
+        copy.extend(children)
+    return copy
+
+
+class Dashboard(Document):
+    """A document laying out charts in rows of *columns* charts, *spacing*
+       pixels apart. The document is as big as the charts need unless a
+       width or height is given
+    """
+    def __init__(self, charts=(), columns=1, spacing=0, stylesheet=None, width=None, height=None, phase_hook=None):
+        self.columns = columns
+        self.spacing = spacing
+        self.stylesheet = get_stylesheet(stylesheet)
+        self.width = width
+        self.height = height
+        self.phase_hook = phase_hook #given the output phase, see timing.py
+        self.charts = []
+        self._svg = None
+        for chart in charts:
+            self.add(chart)
+
+    def add(self, chart, x=None, y=None):
+        """
+            Add a chart, or a chart spec, to the dashboard at (x, y), or in
+            the next free place when no position is given. Returns the chart
+        """
+        if not hasattr(chart, 'render'):
+            chart = make_chart(chart)
+        self.charts.append((chart, x, y))
+        return chart
+
+    def positions(self):
+        """ The (x, y) of each chart, in the order they were added """
+        positions = []
+        row_x = row_y = row_height = in_row = 0
+        for chart, x, y in self.charts:
+            if x is not None and y is not None:
+                positions.append((x, y))
+                continue
+            if self.columns and in_row == self.columns:
+                row_x = in_row = 0
+                row_y += row_height + self.spacing
+                row_height = 0
+            positions.append((row_x, row_y))
+            row_x += chart.width + self.spacing
+            row_height = max(row_height, chart.height)
+            in_row += 1
+        return positions
+
+    def stylesheets(self):
+        """ The stylesheets to emit: the dashboard's, or each distinct one of the charts' """
+        if self.stylesheet is not None:
+            return [self.stylesheet]
+        sheets = []
+        seen = set()
+        for chart, x, y in self.charts:
+            sheet = chart.stylesheet
+            if sheet is not None and sheet.css not in seen:
+                seen.add(sheet.css)
+                sheets.append(sheet)
+        return sheets
+
+    def render(self):
+        """
+            Build the document around the charts' own trees, rendering any
+            that haven't been yet, and return its root. Only the frame is
+            built on each call, so it always shows the charts as they are
+        """
+        positions = zip([chart for chart, x, y in self.charts], self.positions())
+        width = self.width
+        if width is None:
+            width = max([x + chart.width for chart, (x, y) in positions] or [0])
+        height = self.height
+        if height is None:
+            height = max([y + chart.height for chart, (x, y) in positions] or [0])
+
+        root = Node('svg', xmlns="http://www.w3.org/2000/svg", version="1.1", height=str(height), width=str(width))
+        root.attrib["xmlns:svg"] = "http://www.w3.org/2000/svg"
+        for sheet in self.stylesheets():
+            root.append(sheet.node)
+
+        for index, (chart, (x, y)) in enumerate(positions):
+            chart_root = chart.render()
+            frame = Node('svg', dict((key, value) for key, value in chart_root.attrib.items() if key not in DOCUMENT_ATTRIBUTES),
+                         x=str(x), y=str(y), height=str(chart.height), width=str(chart.width))
+            style = chart.stylesheet.node if chart.stylesheet is not None else None
+            prefix = 'frame%s-' % index
+            for child in chart_root:
+                if child is not style:
+                    frame.append(_prefix_ids(child, prefix))
+            root.append(frame)
+        self._svg = root
+        return root
+
+    @property
+    def svg(self):
+        return self.render()
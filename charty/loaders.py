@@ -0,0 +1,290 @@
+"""
+Loading chart data from files.
+
+read_csv streams a CSV or TSV file of columns and read_binary memory-maps a
+file of fixed size numeric records. Either way the result is a Table: the
+chart data, one series per y column, each a Columns of arrays (see
+series.py) rather than a list of tuples, along with the statistics charts
+need, gathered while the file was read so the chart doesn't have to go
+over the data again:
+
+    table = read_csv('exports/sales.csv', x='day', y=['north', 'south'])
+    chart = Column(800, 400, table.data, data_stats=table.stats)
+
+The module is also available as charty.io.
+"""
+
+import csv
+import mmap
+import os
+from array import array
+from collections import namedtuple
+from itertools import chain, islice, izip
+
+from series import Columns
+from stats import DataStats
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+Table = namedtuple('Table', 'data stats names')
+
+#rows parsed and converted at a time
+CHUNK_ROWS = 8192
+#bytes of binary records copied at a time when NumPy isn't available
+CHUNK_BYTES = 1 << 20
+
+
+class LabelDiscovery(object):
+    """The labels and stacked totals of a set of series, gathered a chunk of
+       points at a time in the order the series would be read by DataStats
+    """
+    def __init__(self, series_count):
+        self.found = [[] for i in xrange(series_count)]
+        self.totals = [{} for i in xrange(series_count)]
+
+    def add(self, index, xs, ys):
+        found = self.found[index]
+        totals = self.totals[index]
+        for label, value in izip(xs, ys):
+            if label in totals:
+                totals[label] += value
+            else:
+                totals[label] = value
+                found.append(label)
+
+    def stats(self, data):
+        """ The DataStats of the series, finished off with their ranges and sums """
+        return finish_stats(data, self.found, self.totals)
+
+
+def finish_stats(data, found, totals):
+    """
+        A DataStats for data from the labels found in each series, in the
+        order they first appear, and each series' sum of values per label.
+        The ranges and sums are taken from the value arrays, added up in
+        the order DataStats would add them
+    """
+    stats = DataStats([])
+    stats.min_y = stats.max_y = None
+    stats.total = 0
+    stats.labels = []
+    stats.stack_totals = {}
+    seen = set()
+    for index, (series, labels) in enumerate(zip(data, found)):
+        ys = series.ys
+        if len(ys):
+            lo, hi = min(ys), max(ys)
+            stats.total = sum(ys, stats.total)
+            if stats.min_y is None or lo < stats.min_y:
+                stats.min_y = lo
+            if stats.max_y is None or hi > stats.max_y:
+                stats.max_y = hi
+        for label in labels:
+            if label not in seen:
+                seen.add(label)
+                stats.labels.append(label)
+        if not index:
+            stats.stack_totals = dict(totals[0])
+            continue
+        #a label's total carries on from the series before, so adding this series' own sum to it would round differently
+        stack_totals = stats.stack_totals
+        for label, value in izip(series.xs, ys):
+            if label in stack_totals:
+                stack_totals[label] += value
+            else:
+                stack_totals[label] = value
+    stats.numeric_labels = not [l for l in stats.labels if isinstance(l, str)]
+    return stats
+
+
+def _column_index(column, names):
+    if isinstance(column, basestring):
+        if names is None:
+            raise ValueError("column %r named, but the file has no header row" % column)
+        return names.index(column)
+    return column
+
+
+def _guess_x_type(text):
+    """ int or float if the first x label is one, else the labels are kept as strings """
+    for x_type in (int, float):
+        try:
+            x_type(text)
+            return x_type
+        except ValueError:
+            pass
+    return str
+
+
+def _label_column(x_type):
+    """ An empty container for x labels of x_type """
+    if x_type is int:
+        return array('l')
+    if x_type is float:
+        return array('d')
+    return []
+
+
+def _extend(column, values):
+    """ column extended by values, or a list of both if they don't fit in its array """
+    if isinstance(column, array):
+        size = len(column)
+        try:
+            column.extend(values)
+            return column
+        except OverflowError:
+            #labels too big for a C long are kept as Python numbers; the
+            #array may have taken some of the values before giving up
+            column = column[:size].tolist()
+    column.extend(values)
+    return column
+
+
+def read_csv(source, x=0, y=None, delimiter=None, header=None, x_type=None):
+    """
+        Read a CSV or TSV file, a path or an open file, into a Table with a
+        series for each y column (all but the x column if y isn't given).
+        Columns are given by index, or by name if the file has a header row.
+
+        The delimiter is a tab for .tsv files and for files whose first line
+        has tabs but no commas, and a comma otherwise. header says whether
+        the first row holds column names, and is guessed from whether it
+        has anything in the y columns that isn't a number. x labels are
+        converted with x_type (any callable), which defaults to int or float
+        if the first label is one and leaves them as strings otherwise;
+        integer labels too big for an array('l') are kept in a list. y
+        values are read as floats, and empty ones are left out of their
+        series. The file is read a chunk of rows at a time
+    """
+    close = False
+    if isinstance(source, basestring):
+        path = source
+        source = open(source, 'rb')
+        close = True
+    else:
+        path = getattr(source, 'name', '')
+    try:
+        first = source.readline()
+        if not first:
+            return Table([], DataStats([]), [])
+        if delimiter is None:
+            if path.lower().endswith(('.tsv', '.tab')) or ('\t' in first and ',' not in first):
+                delimiter = '\t'
+            else:
+                delimiter = ','
+        reader = csv.reader(chain([first], source), delimiter=delimiter)
+        first_row = next(reader)
+
+        if header is None:
+            header = False
+            for i, text in enumerate(first_row):
+                if i != x and text.strip():
+                    try:
+                        float(text)
+                    except ValueError:
+                        header = True
+                        break
+        names = first_row if header else None
+        rows = reader if header else chain([first_row], reader)
+
+        x = _column_index(x, names)
+        if y is None:
+            y = [i for i in xrange(len(first_row)) if i != x]
+        elif not isinstance(y, (list, tuple)):
+            y = [y]
+        y = [_column_index(column, names) for column in y]
+        if names is not None:
+            series_names = [names[i] for i in y]
+        else:
+            series_names = ['series %s' % (i + 1) for i in xrange(len(y))]
+
+        data = None
+        discovery = LabelDiscovery(len(y))
+        line = 1 if header else 0
+        while True:
+            chunk = list(islice(rows, CHUNK_ROWS))
+            if not chunk:
+                break
+            if data is None:
+                if x_type is None:
+                    x_type = _guess_x_type(chunk[0][x])
+                data = [Columns(_label_column(x_type), array('d')) for column in y]
+            try:
+                labels = map(x_type, [row[x] for row in chunk])
+                for index, column in enumerate(y):
+                    texts = [row[column] for row in chunk]
+                    if '' in texts:
+                        kept = [i for i, text in enumerate(texts) if text != '']
+                        xs = [labels[i] for i in kept]
+                        ys = map(float, [texts[i] for i in kept])
+                    else:
+                        xs = labels
+                        ys = map(float, texts)
+                    data[index].xs = _extend(data[index].xs, xs)
+                    data[index].ys.extend(ys)
+                    discovery.add(index, xs, ys)
+            except (ValueError, IndexError), e:
+                raise ValueError("couldn't read rows %s to %s of %s: %s" % (line + 1, line + len(chunk), path or 'csv data', e))
+            line += len(chunk)
+
+        if data is None:
+            data = [Columns(array('d'), array('d')) for column in y]
+        return Table(data, discovery.stats(data), series_names)
+    finally:
+        if close:
+            source.close()
+
+
+def read_binary(source, fields, x=0, y=None, typecode='d'):
+    """
+        Memory-map a file of fixed size records, each *fields* numbers of
+        the array typecode (native byte order, 'd' for doubles), into a
+        Table with a series for each y field (all but the x field if y
+        isn't given). With NumPy the columns are views of the mapped file,
+        so nothing is copied until the chart is drawn; without it they're
+        copied into arrays a chunk at a time
+    """
+    if y is None:
+        y = [i for i in xrange(fields) if i != x]
+    elif not isinstance(y, (list, tuple)):
+        y = [y]
+    names = ['series %s' % (i + 1) for i in xrange(len(y))]
+    record_size = array(typecode).itemsize * fields
+
+    f = open(source, 'rb') if isinstance(source, basestring) else source
+    try:
+        size = os.fstat(f.fileno()).st_size
+        if size % record_size:
+            raise ValueError("%s isn't a whole number of %s byte records" % (getattr(f, 'name', 'the file'), record_size))
+        if not size:
+            data = [Columns(array(typecode), array(typecode)) for column in y]
+            return Table(data, DataStats(data), names)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        if isinstance(source, basestring):
+            f.close()
+
+    if numpy is not None:
+        records = numpy.frombuffer(mapped, dtype=typecode).reshape(-1, fields)
+        data = [Columns(records[:, x], records[:, column]) for column in y]
+        #DataStats takes the statistics of array columns from the arrays themselves
+        return Table(data, DataStats(data), names)
+
+    data = [Columns(array(typecode), array(typecode)) for column in y]
+    discovery = LabelDiscovery(len(y))
+    chunk_size = max(1, CHUNK_BYTES // record_size) * record_size
+    try:
+        for start in xrange(0, size, chunk_size):
+            records = array(typecode, mapped[start:start + chunk_size])
+            labels = records[x::fields]
+            for index, column in enumerate(y):
+                values = records[column::fields]
+                data[index].xs.extend(labels)
+                data[index].ys.extend(values)
+                discovery.add(index, labels, values)
+    finally:
+        mapped.close()
+    return Table(data, discovery.stats(data), names)
@@ -0,0 +1,91 @@
+"""
+A lightweight element tree for charts that are only going to be written out.
+
+ElementTree elements each carry a full instance dictionary and a children
+list, which adds up when a chart draws hundreds of thousands of bars. Node
+keeps the same fields in __slots__, only gets a children list once it has a
+child, and skips ElementTree's attribute copying. It supports the part of
+the element interface charts and the serializer use (append, indexing,
+slicing, iteration, get and set), so it can stand in for ET.Element when a
+chart is given backend='lite'. to_etree converts a tree of Nodes back to
+ElementTree for anyone who wants to work on it further.
+"""
+
+import xml.etree.ElementTree as ET
+
+
+class Node(object):
+    """An svg element: tag, attributes, text, tail and children"""
+    __slots__ = ('tag', 'attrib', 'text', 'tail', '_children')
+
+    def __init__(self, tag, attrib=None, **extra):
+        if attrib:
+            extra.update(attrib)
+        self.tag = tag
+        self.attrib = extra
+        self.text = None
+        self.tail = None
+        self._children = ()
+
+    def __repr__(self):
+        return '<Node %s at %#x>' % (self.tag, id(self))
+
+    def __len__(self):
+        return len(self._children)
+
+    def __iter__(self):
+        return iter(self._children)
+
+    def __getitem__(self, index):
+        return self._children[index]
+
+    def __setitem__(self, index, element):
+        self._editable()[index] = element
+
+    def __delitem__(self, index):
+        del self._editable()[index]
+
+    def _editable(self):
+        if not isinstance(self._children, list):
+            self._children = list(self._children)
+        return self._children
+
+    def append(self, element):
+        if self._children:
+            self._children.append(element)
+        else:
+            self._children = [element]
+
+    def extend(self, elements):
+        self._editable().extend(elements)
+
+    def insert(self, index, element):
+        self._editable().insert(index, element)
+
+    def remove(self, element):
+        self._editable().remove(element)
+
+    def get(self, key, default=None):
+        return self.attrib.get(key, default)
+
+    def set(self, key, value):
+        self.attrib[key] = value
+
+    def iter(self, tag=None):
+        """ This node and all its descendants in document order, optionally only those with *tag* """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if tag is None or node.tag == tag:
+                yield node
+            stack.extend(reversed(list(node)))
+
+
+def to_etree(node):
+    """ An ElementTree copy of a tree of Nodes """
+    element = ET.Element(node.tag, dict(node.attrib))
+    element.text = node.text
+    element.tail = node.tail
+    for child in node:
+        element.append(to_etree(child))
+    return element
@@ -0,0 +1,171 @@
+"""
+Formatting coordinates and path data.
+
+Coordinates are written with "%s" unless a chart has a precision, in which
+case they are rounded to that many decimal places and trailing zeros are
+dropped. compact_path writes a line through a list of points with as few
+characters as svg path syntax allows: one relative lineto command for the
+whole line, no separator where a sign or decimal point already splits two
+numbers, no leading zeros, and no segments that round to nothing.
+absolute_path trades that size for speed where lines are short, and
+spaced_path does the same for evenly spaced points, such as a sparkline's.
+rect_path writes a bar as a subpath, so that many bars can share one path.
+"""
+
+#decimal places kept by compact paths when the chart has no precision of its own
+PATH_PRECISION = 1
+
+#distinct x spacings spaced_path keeps formatted before it starts over
+MAX_CACHED_SPACINGS = 64
+
+_spacings = {}
+
+
+def number_formatter(precision):
+    """ A function formatting a coordinate to *precision* decimal places (None for "%s") """
+    if precision is None:
+        return str
+
+    def format_number(value):
+        text = '%.*f' % (precision, value)
+        if '.' in text:
+            text = text.rstrip('0').rstrip('.')
+        if text == '-0':
+            text = '0'
+        return text
+    return format_number
+
+
+def _scaled_text(n, precision):
+    """ The shortest text for n / 10**precision, where n is an integer """
+    if not precision:
+        return str(n)
+    #n is well within the 15 or so digits a float holds exactly, so this formats n itself
+    text = ('%.*f' % (precision, n / float(10 ** precision))).rstrip('0')
+    if text[-1] == '.':
+        return text[:-1]
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
+
+
+def _join(texts):
+    parts = []
+    after_point = False
+    for text in texts:
+        if parts and not (text[0] == '-' or (text[0] == '.' and after_point)):
+            parts.append(' ')
+        parts.append(text)
+        after_point = '.' in text
+    return ''.join(parts)
+
+
+def compact_path(points, precision=None):
+    """
+        Path data for a line through (x, y) points: a moveto to the first
+        point, then one relative lineto through the rest. Positions are
+        rounded before the steps between them are taken, so rounding
+        errors don't add up along the line.
+    """
+    if precision is None:
+        precision = PATH_PRECISION
+    scale = 10 ** precision
+    points = iter(points)
+    for x, y in points:
+        previous_x = int(round(x * scale))
+        previous_y = int(round(y * scale))
+        break
+    else:
+        return ''
+    path = 'M' + _join([_scaled_text(previous_x, precision), _scaled_text(previous_y, precision)])
+
+    #steps repeat a lot along a line (every x step is much the same), so each is formatted once
+    texts = {}
+    parts = []
+    append = parts.append
+    after_point = None
+    for x, y in points:
+        x = int(round(x * scale))
+        y = int(round(y * scale))
+        if x == previous_x and y == previous_y:
+            continue
+        text = texts.get(x - previous_x)
+        if text is None:
+            text = texts[x - previous_x] = _scaled_text(x - previous_x, precision)
+        if after_point is not None and not (text[0] == '-' or (after_point and text[0] == '.')):
+            append(' ')
+        append(text)
+        after_point = '.' in text
+        text = texts.get(y - previous_y)
+        if text is None:
+            text = texts[y - previous_y] = _scaled_text(y - previous_y, precision)
+        if not (text[0] == '-' or (after_point and text[0] == '.')):
+            append(' ')
+        append(text)
+        after_point = '.' in text
+        previous_x = x
+        previous_y = y
+
+    if parts:
+        path += 'l' + ''.join(parts)
+    return path
+
+
+def absolute_path(points, precision=None):
+    """
+        Path data for a line through (x, y) points as absolute coordinates
+        with a fixed number of decimal places. Longer than compact_path, but
+        several times quicker to write, which suits short lines
+    """
+    if precision is None:
+        precision = PATH_PRECISION
+    pair = '%%.%df %%.%df' % (precision, precision)
+    path = ' '.join([pair % point for point in points])
+    if not path:
+        return ''
+    return 'M' + path
+
+
+def _spacing(count, left, step, precision):
+    """ The formatted x coordinates of a spacing, and the format of a path through them """
+    key = (count, left, step, precision)
+    spacing = _spacings.get(key)
+    if spacing is None:
+        if len(_spacings) >= MAX_CACHED_SPACINGS:
+            _spacings.clear()
+        number = '%%.%df' % precision
+        xs = [number % (left + (i * step)) for i in xrange(count)]
+        #the xs are written into the path's format, leaving only the ys to fill in
+        spacing = _spacings[key] = (xs, 'M' + ' '.join(['%s %s' % (x, number) for x in xs]))
+    return spacing
+
+
+def spaced_xs(count, left, step, precision=None):
+    """
+        The x coordinates left, left + step, left + 2 * step, ... of count
+        evenly spaced points, formatted as absolute_path formats them. Each
+        spacing is formatted once and kept, since a page of sparklines
+        tends to share a few
+    """
+    if precision is None:
+        precision = PATH_PRECISION
+    return _spacing(count, left, step, precision)[0]
+
+
+def spaced_path(left, step, ys, precision=None):
+    """
+        Path data for a line through the list of y coordinates ys at the
+        x positions spaced_xs gives, written as absolute_path writes them
+    """
+    if not ys:
+        return ''
+    if precision is None:
+        precision = PATH_PRECISION
+    return _spacing(len(ys), left, step, precision)[1] % tuple(ys)
+
+
+def rect_path(x, y, width, height, format=str):
+    """ A closed subpath tracing the rectangle a <rect> with these attributes would draw """
+    return 'M%s %sh%sv%sh%sz' % (format(x), format(y), format(width), format(height), format(-width))
@@ -0,0 +1,128 @@
+"""
+Streaming serialization of chart trees to SVG markup.
+
+The tree is walked once and written out in chunks through a write callable,
+so no full-document string (let alone a second parsed copy of it) is ever
+held in memory. Output is compact by default; pretty printing indents
+elements as they are written.
+"""
+
+import re
+import xml.etree.ElementTree as ET
+
+XML_DECLARATION = '<?xml version="1.0" encoding="utf-8"?>\n'
+
+#bytes to accumulate before handing them to the write callable
+CHUNK_SIZE = 64 * 1024
+
+
+def _escape_text(text):
+    if isinstance(text, unicode):
+        text = text.encode('utf-8')
+    elif not isinstance(text, str):
+        text = str(text)
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+def _escape_attrib(value):
+    value = _escape_text(value)
+    if '"' in value:
+        value = value.replace('"', '&quot;')
+    if '\n' in value:
+        value = value.replace('\n', '&#10;')
+    return value
+
+
+_needs_escape = re.compile(r'[&<>"\n]').search
+
+
+def _start_tag(elem):
+    attrib = elem.attrib
+    if not attrib:
+        return '<' + elem.tag
+    items = sorted(attrib.items())
+    #most attribute values are plain strings with nothing to escape, so
+    #they're checked all at once and then written as they are
+    try:
+        values = ''.join([value for key, value in items])
+    except TypeError:
+        values = None
+    if values.__class__ is str and not _needs_escape(values):
+        return '<%s %s' % (elem.tag, ' '.join(['%s="%s"' % item for item in items]))
+    return '<%s %s' % (elem.tag, ' '.join(['%s="%s"' % (key, _escape_attrib(value)) for key, value in items]))
+
+
+def iter_svg(root, pretty=False, indent='\t'):
+    """
+        Generate the markup for an element tree piece by piece. Anything
+        with the ElementTree element interface (tag, attrib, text, tail and
+        iteration over children) can be serialized.
+    """
+    yield XML_DECLARATION
+    #stack of (element, depth, closing) entries, so deep trees don't recurse
+    stack = [(root, 0, False)]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        elem, depth, closing = pop()
+        inline = not pretty or elem.text or depth < 0
+        if closing:
+            if pretty and not inline:
+                yield '\n' + indent * depth
+            yield '</%s>' % elem.tag
+            if elem.tail:
+                yield _escape_text(elem.tail)
+            continue
+
+        if pretty and depth > 0:
+            yield '\n' + indent * depth
+
+        tag = elem.tag
+        if tag is ET.Comment:
+            yield '<!--%s-->' % _escape_text(elem.text or '')
+            if elem.tail:
+                yield _escape_text(elem.tail)
+            continue
+
+        #a slice is a single call, where listing an ElementTree element fetches each child in turn
+        children = elem[:]
+        if not children and not elem.text:
+            yield _start_tag(elem) + '/>'
+            if elem.tail:
+                yield _escape_text(elem.tail)
+            continue
+
+        yield _start_tag(elem) + '>'
+        if elem.text:
+            yield _escape_text(elem.text)
+        push((elem, depth, True))
+        #mixed content is written as is, since indenting it would change the text
+        child_depth = depth + 1 if not inline else -1
+        for child in reversed(children):
+            push((child, child_depth, False))
+    if pretty:
+        yield '\n'
+
+
+def write_svg(root, write, pretty=False, indent='\t', chunk_size=CHUNK_SIZE):
+    """
+        Serialize an element tree through *write*, typically a file object's
+        write method, in chunks of roughly *chunk_size* bytes
+    """
+    pending = []
+    size = 0
+    for piece in iter_svg(root, pretty, indent):
+        pending.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            write(''.join(pending))
+            pending = []
+            size = 0
+    if pending:
+        write(''.join(pending))
@@ -0,0 +1,130 @@
+"""
+Series given as something other than a list of (x, y) tuples.
+
+A series can be any iterable of (x, y) points, such as a generator or a
+database cursor, rather than a list. Most charts need to go over their data
+more than once, so a series that can only be read once is read into a list
+when the chart is laid out. A Line given both an x_range and a y_range
+doesn't need to look at its data before drawing, so it reads each series
+once, while drawing it, and keeps no more of it than the path it writes.
+That only works for numeric, date or datetime x labels; text labels are
+placed by their order in the data, which has to be read first:
+
+    cursor.execute('SELECT day, total FROM sales ORDER BY day')
+    chart = Line(600, 300, [cursor], x_range=(first_day, last_day), y_range=(0, 5000))
+
+A series can also be given as columns: a column of x labels and a column of
+y values, each an array.array or a one dimensional NumPy array, as the pair
+(xs, ys). The data may also be a mapping of series names to (xs, ys) pairs
+of any sequences, drawn in the mapping's order. Either way the series
+becomes a Columns, which charts read like a list of points without the
+points ever being stored as tuples, and which NumPy places in bulk (see
+coordinates.py).
+"""
+
+from array import array
+from itertools import izip
+
+#points converted from NumPy scalars to Python numbers at a time when iterating over array columns
+CHUNK_SIZE = 4096
+
+
+def is_column(values):
+    """ Whether values is an array.array or a one dimensional NumPy array """
+    return isinstance(values, array) or getattr(values, 'ndim', None) == 1
+
+
+class Columns(object):
+    """A series held as a sequence of x labels and a sequence of y values.
+       Indexing and iterating give (x, y) points of plain Python numbers,
+       the same as a list of tuples would
+    """
+    def __init__(self, xs, ys):
+        if len(xs) != len(ys):
+            raise ValueError("a series needs as many x labels as y values, not %s and %s" % (len(xs), len(ys)))
+        self.xs = xs
+        self.ys = ys
+
+    def __repr__(self):
+        return 'Columns(%r, %r)' % (self.xs, self.ys)
+
+    def __len__(self):
+        return len(self.ys)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Columns(self.xs[index], self.ys[index])
+        return (_python_number(self.xs[index]), _python_number(self.ys[index]))
+
+    def __iter__(self):
+        xs, ys = self.xs, self.ys
+        if not hasattr(xs, 'dtype') and not hasattr(ys, 'dtype'):
+            return izip(xs, ys)
+        return self._iter_chunks()
+
+    def _iter_chunks(self):
+        #NumPy arrays yield NumPy scalars, which print differently from Python numbers, so convert a chunk at a time
+        for start in xrange(0, len(self), CHUNK_SIZE):
+            for point in izip(_as_list(self.xs[start:start + CHUNK_SIZE]), _as_list(self.ys[start:start + CHUNK_SIZE])):
+                yield point
+
+
+def _python_number(value):
+    if hasattr(value, 'dtype'):
+        return value.item()
+    return value
+
+
+def _as_list(values):
+    if hasattr(values, 'dtype'):
+        return values.tolist()
+    return values
+
+
+def columnar(data):
+    """
+        The chart data with any series given as a pair of array columns
+        turned into Columns; a mapping of names to (xs, ys) becomes a list
+        of Columns in the mapping's order
+    """
+    if hasattr(data, 'values') and hasattr(data, 'keys'):
+        return [Columns(xs, ys) for xs, ys in data.values()]
+    if not [series for series in data if _is_column_pair(series)]:
+        return data
+    return [Columns(*series) if _is_column_pair(series) else series for series in data]
+
+
+def _is_column_pair(series):
+    return isinstance(series, tuple) and len(series) == 2 and is_column(series[0]) and is_column(series[1])
+
+
+def series_key(series):
+    """ A string identifying a series' contents, for cache keys """
+    if not isinstance(series, Columns):
+        return repr(series)
+    parts = ['Columns']
+    for values in (series.xs, series.ys):
+        if hasattr(values, 'dtype') and values.dtype.kind != 'O':
+            parts.append('%s:%s' % (values.dtype.str, values.tostring()))
+        elif isinstance(values, array):
+            parts.append('%s:%s' % (values.typecode, values.tostring()))
+        else:
+            parts.append(repr(_as_list(values)))
+    return '\0'.join(parts)
+
+
+def is_stream(series):
+    """ Whether a series can only be read once, unlike a list or tuple """
+    return not isinstance(series, basestring) and not hasattr(series, '__getitem__')
+
+
+def materialize(data):
+    """ data with every series that can only be read once read into a list """
+    if not [series for series in data if is_stream(series)]:
+        return data
+    return [list(series) if is_stream(series) else series for series in data]
+
+
+def point_count(data):
+    """ The number of points in the series that know their length """
+    return sum([len(series) for series in data if series != 'placeholder' and hasattr(series, '__len__')])
@@ -0,0 +1,170 @@
+"""
+Summary statistics of chart data.
+
+Charts need the range of their values, the distinct x labels, the sum of
+all values (pie charts) and the sum stacked on each label (stacked columns)
+before they can draw anything. DataStats gathers all of them in one pass
+over the data, and charts read from it instead of walking the data again
+for each.
+
+With NumPy installed, data made up entirely of Columns of numeric arrays
+(see series.py) has its statistics taken from the arrays instead, with the
+same results the loop over its points would give.
+"""
+
+from array import array
+
+from series import Columns
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#array typecodes whose values NumPy reads as the same numbers
+NUMERIC_TYPECODES = 'bBhHilfd'
+
+
+class DataStats(object):
+    """Statistics of a list of data series, gathered in a single pass.
+
+       min_y, max_y - smallest and largest numeric value (None if there are none)
+       total - sum of all numeric values
+       stack_totals - sum of the numeric values on each label
+       labels - distinct labels, in the order they first appear
+       numeric_labels - False if any label is a string
+
+       Values that are strings are displayed rather than plotted, so they
+       are left out. Placeholder series are skipped.
+    """
+    def __init__(self, data):
+        if numpy is not None and data and self._from_arrays(data):
+            return
+        min_y = max_y = None
+        total = 0
+        stack_totals = {}
+        labels = []
+        seen = set()
+        numeric_labels = True
+
+        for series in data:
+            if series != 'placeholder':
+                for point in series:
+                    label = point[0]
+                    value = point[1]
+                    if label not in seen:
+                        seen.add(label)
+                        labels.append(label)
+                        if isinstance(label, str): numeric_labels = False
+
+                    if isinstance(value, basestring):
+                        continue
+                    if min_y is None:
+                        min_y = max_y = value
+                    elif value < min_y:
+                        min_y = value
+                    elif value > max_y:
+                        max_y = value
+                    total += value
+                    if label in stack_totals:
+                        stack_totals[label] += value
+                    else:
+                        stack_totals[label] = value
+
+        self.min_y = min_y
+        self.max_y = max_y
+        self.total = total
+        self.stack_totals = stack_totals
+        self.labels = labels
+        self.numeric_labels = numeric_labels
+
+    def _from_arrays(self, data):
+        """
+            Gather the statistics of data whose series are all Columns of
+            numeric arrays with NumPy, and return True, or return False
+            without gathering anything if that can't give the loop's results
+        """
+        columns = []
+        for series in data:
+            if series == 'placeholder':
+                columns.append(None)
+                continue
+            if not isinstance(series, Columns):
+                return False
+            xs, ys = _numeric_array(series.xs), _numeric_array(series.ys)
+            if xs is None or ys is None:
+                return False
+            columns.append((xs, ys))
+        present = [pair for pair in columns if pair is not None]
+        #mixed label types or mixed integer and float values would come out as different Python numbers
+        if not present or len(set([x.dtype for x, y in present])) > 1 or len(set([y.dtype.kind for x, y in present])) > 1:
+            return False
+        xs = numpy.concatenate([x for x, y in present])
+        ys = numpy.concatenate([y for x, y in present])
+        integers = ys.dtype.kind != 'f'
+        if not integers and numpy.isnan(ys).any():
+            #min and max would give NaN where the loop's comparisons pass over it
+            return False
+        if integers and len(ys) and max(abs(int(ys.min())), abs(int(ys.max()))) * len(ys) >= 2 ** 53:
+            #the sums are taken in doubles, which only hold integers exactly up to 2 ** 53
+            return False
+        ys = numpy.asarray(ys, dtype=numpy.float64)
+
+        min_y = max_y = None
+        for pair in present:
+            if len(pair[1]):
+                lo, hi = pair[1].min().item(), pair[1].max().item()
+                if min_y is None or lo < min_y:
+                    min_y = lo
+                if max_y is None or hi > max_y:
+                    max_y = hi
+
+        self.min_y = min_y
+        self.max_y = max_y
+        self.total = 0
+        self.stack_totals = {}
+        self.labels = []
+        self.numeric_labels = True
+        if not len(ys):
+            return True
+
+        #unique sorts the labels; each one is taken from where it first appears
+        first, slots = numpy.unique(xs, return_index=True, return_inverse=True)[1:]
+        #bincount and accumulate add the values up in order, as the loop does
+        sums = numpy.bincount(slots, weights=ys, minlength=len(first))
+        total = numpy.add.accumulate(ys)[-1]
+        if integers:
+            sums = sums.astype(numpy.int64)
+        self.total = int(total) if integers else float(total)
+        self.stack_totals = dict(zip(xs[first].tolist(), sums.tolist()))
+        self.labels = xs[numpy.sort(first)].tolist()
+        return True
+
+    @classmethod
+    def from_bounds(cls, x_range, y_range):
+        """
+            Statistics standing in for data that hasn't been read, from the
+            (lowest, highest) x label and y value the caller says it has.
+            The two x labels are the only labels, and there are no totals
+        """
+        stats = cls([])
+        stats.min_y, stats.max_y = y_range
+        stats.total = None
+        stats.labels = [x_range[0]] if x_range[0] == x_range[1] else list(x_range)
+        stats.numeric_labels = not [l for l in stats.labels if isinstance(l, str)]
+        return stats
+
+
+def _numeric_array(values):
+    """ values as a NumPy array if they're an array of plain numbers, else None """
+    if isinstance(values, array):
+        if values.typecode not in NUMERIC_TYPECODES:
+            return None
+        values = numpy.frombuffer(values, dtype=values.typecode) if len(values) else numpy.array([], dtype=values.typecode)
+    elif not hasattr(values, 'dtype') or getattr(values, 'ndim', None) != 1:
+        return None
+    kind = values.dtype.kind
+    #floats wider than doubles and unsigned 64 bit integers don't come back as the same Python numbers
+    if (kind == 'f' and values.dtype.itemsize <= 8) or kind == 'i' or (kind == 'u' and values.dtype.itemsize < 8):
+        return values
+    return None
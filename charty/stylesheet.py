@@ -0,0 +1,83 @@
+"""
+Stylesheets for embedding in charts.
+
+There isn't a graceful way to load an external stylesheet when you're not
+in a browser, so each chart carries its CSS inside a <style> node. Files are
+read and turned into that node once per process: loaded stylesheets are kept
+in a small cache keyed on the file's path, modification time and size, and
+every chart using the same file shares the same node. CSS that isn't in a
+file is given to charts wrapped in a Stylesheet:
+
+    Line(600, 300, data, Stylesheet('.series-1-line { stroke: red }'))
+"""
+
+import os
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+#how many distinct stylesheet files to keep parsed at once
+MAX_CACHED_STYLESHEETS = 32
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class Stylesheet(object):
+    """CSS text along with the <style> node that embeds it in a chart.
+       The node is shared by every chart using the stylesheet, so treat it
+       as read only.
+    """
+    def __init__(self, css, path=None):
+        self.css = css
+        self.path = path
+        self.node = ET.Element('style', type="text/css")
+        self.node.text = css
+
+    @classmethod
+    def from_file(cls, path):
+        f = open(path, 'r')
+        try:
+            css = "\n".join(f.readlines())
+        finally:
+            f.close()
+        return cls(css, path)
+
+
+def load_stylesheet(path):
+    """
+        Return the Stylesheet for a css file, reading it only if it isn't
+        cached or has changed on disk since it was cached
+    """
+    path = os.path.abspath(path)
+    info = os.stat(path)
+    #an edit within the same mtime tick usually changes the size, so check both
+    version = (info.st_mtime, info.st_size)
+
+    with _cache_lock:
+        cached = _cache.pop(path, None)
+        if cached is not None and cached[0] == version:
+            _cache[path] = cached
+            return cached[1]
+
+    sheet = Stylesheet.from_file(path)
+    with _cache_lock:
+        _cache[path] = (version, sheet)
+        while len(_cache) > MAX_CACHED_STYLESHEETS:
+            _cache.popitem(last=False)
+    return sheet
+
+
+def get_stylesheet(source):
+    """
+        Resolve the stylesheet argument charts accept: a path to a css file,
+        a Stylesheet (Stylesheet(css) for css given as a string), or None
+    """
+    if source is None or isinstance(source, Stylesheet):
+        return source
+    return load_stylesheet(source)
+
+
+def clear_stylesheet_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,152 @@
+"""
+Timing the phases of drawing a chart.
+
+Charts report how long each step of their work takes to a phase hook:
+any callable taking the phase name, the seconds it took and a count of
+what it produced. A hook is given to one chart with its phase_hook
+keyword, or to every chart drawn by the current thread inside a
+record_phases block:
+
+    with record_phases() as phases:
+        chart.output('chart.svg')
+    for phase in phases:
+        print phase.name, phase.seconds, phase.elements
+
+The phases are:
+
+    stats - scanning the data (elements is the number of points)
+    layout - working out scales and axis ticks
+    setup_chart - drawing the background, grid and axes
+    data_series - drawing the series
+    set_labels, set_notches - drawing the x axis labels and notches
+    output - serializing the tree (elements is the size of the tree)
+
+and elements is otherwise the number of svg elements the phase added.
+Nothing is timed or counted unless a hook is listening.
+
+The start of each phase is also where drawing can be stopped: a chart
+drawn by a thread inside a cancellable(event) block raises RenderCancelled
+at its next phase once the event is set (see aio.py).
+"""
+
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+Phase = namedtuple('Phase', 'name seconds elements')
+
+
+class _State(threading.local):
+    #defaults, so every phase reads them without a failed attribute lookup
+    hooks = ()
+    cancel = None
+
+
+_local = _State()
+
+
+def active_hooks():
+    """ The hooks installed by record_phases blocks on this thread """
+    return _local.hooks
+
+
+@contextmanager
+def record_phases(hook=None):
+    """
+        Report the phases of every chart drawn by this thread inside the
+        block to *hook*. Without a hook, the phases are collected as a list
+        of Phase tuples, which is what the block gets
+    """
+    phases = []
+    if hook is None:
+        hook = lambda name, seconds, elements: phases.append(Phase(name, seconds, elements))
+    previous = active_hooks()
+    _local.hooks = previous + (hook,)
+    try:
+        yield phases
+    finally:
+        _local.hooks = previous
+
+
+class RenderCancelled(Exception):
+    """ Raised at the start of a phase of a chart whose drawing has been cancelled """
+
+
+@contextmanager
+def cancellable(event):
+    """
+        Stop any chart this thread draws inside the block at the start of
+        its next phase once *event*, a threading.Event, is set
+    """
+    previous = _local.cancel
+    _local.cancel = event
+    try:
+        yield
+    finally:
+        _local.cancel = previous
+
+
+def check_cancelled():
+    """ Raise RenderCancelled if this thread's drawing has been cancelled """
+    event = _local.cancel
+    if event is not None and event.is_set():
+        raise RenderCancelled()
+
+
+def count_elements(root):
+    """ The number of elements in a tree, root included """
+    if root is None:
+        return 0
+    count = 1
+    stack = list(root)
+    while stack:
+        elem = stack.pop()
+        count += 1
+        stack.extend(elem)
+    return count
+
+
+class timed(object):
+    """
+        Time the block as the phase *name* of *chart*, and report it to the
+        chart's hook and any record_phases hooks. The count is what *count*
+        returns when called after the block, or else the number of elements
+        added to the chart's tree during the block. Raises RenderCancelled
+        instead if the chart's drawing has been cancelled.
+
+        A class rather than a generator, since small charts such as
+        sparklines pass through several phases for very little work
+    """
+    __slots__ = ('chart', 'name', 'count', 'hooks', 'before', 'start')
+
+    def __init__(self, chart, name, count=None):
+        self.chart = chart
+        self.name = name
+        self.count = count
+
+    def __enter__(self):
+        #check_cancelled and active_hooks, read straight from the thread's state
+        state = _local
+        if state.cancel is not None and state.cancel.is_set():
+            raise RenderCancelled()
+        hooks = state.hooks
+        if self.chart.phase_hook is not None:
+            hooks = (self.chart.phase_hook,) + hooks
+        self.hooks = hooks
+        if hooks:
+            if self.count is None:
+                self.before = count_elements(self.chart._svg)
+            self.start = time.time()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.hooks or exc_type is not None:
+            return False
+        seconds = time.time() - self.start
+        if self.count is None:
+            elements = count_elements(self.chart._svg) - self.before
+        else:
+            elements = self.count()
+        for hook in self.hooks:
+            hook(self.name, seconds, elements)
+        return False
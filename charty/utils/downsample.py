@@ -0,0 +1,139 @@
+"""
+Reduce a series of (x, y) points to a fixed budget while keeping the
+shape a plotted line would have.
+
+:func:`lttb` implements Largest-Triangle-Three-Buckets (Steinarsson,
+_Downsampling Time Series for Visual Representation_, 2013): the points
+are split into equal buckets, and from each bucket the point forming the
+largest triangle with the previously chosen point and the average of the
+next bucket is kept. :func:`minmax` keeps the lowest and highest point of
+each bucket, which preserves every peak at the cost of twice the points per
+bucket.
+
+Both always keep the first and last point, and return the input unchanged
+when it already fits in the budget. They work on the x and y values as two
+sequences, so a series.Columns is read without building a pair per point.
+"""
+
+from __future__ import division
+
+
+def _columns(points):
+    """
+    The x and y values of *points* as two sequences, taken straight from a
+    series.Columns rather than unpacked from each pair
+    """
+    if hasattr(points, 'xs') and hasattr(points, 'ys'):
+        xs, ys = points.xs, points.ys
+        #arrays give array scalars when indexed, so read them as lists of Python numbers
+        if hasattr(xs, 'tolist'):
+            xs = xs.tolist()
+        if hasattr(ys, 'tolist'):
+            ys = ys.tolist()
+        return xs, ys
+    return [point[0] for point in points], [point[1] for point in points]
+
+
+def lttb(points, threshold):
+    """
+    Downsample *points*, a sequence of (x, y) pairs, to *threshold* points
+    using Largest-Triangle-Three-Buckets.
+    """
+    n = len(points)
+    if threshold >= n or n < 3:
+        return points
+    if threshold < 3:
+        return [points[0], points[-1]]
+
+    xs, ys = _columns(points)
+    sampled = [(xs[0], ys[0])]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in xrange(threshold - 2):
+        #average of the next bucket, the third point of each triangle
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        avg_x = avg_y = 0.0
+        for x in xs[avg_start:avg_end]:
+            avg_x += x
+        for y in ys[avg_start:avg_end]:
+            avg_y += y
+        avg_len = avg_end - avg_start
+        avg_x /= avg_len
+        avg_y /= avg_len
+
+        ax = xs[a]
+        ay = ys[a]
+        max_area = -1
+        chosen = a
+        for j in xrange(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                chosen = j
+        sampled.append((xs[chosen], ys[chosen]))
+        a = chosen
+
+    sampled.append((xs[-1], ys[-1]))
+    return sampled
+
+
+def minmax(points, threshold):
+    """
+    Downsample *points*, a sequence of (x, y) pairs, to at most *threshold*
+    points by keeping the minimum and maximum y of each bucket, in their
+    original order. Below 4 points there's no room for a bucket's pair, so
+    only the first and last point are kept.
+    """
+    n = len(points)
+    if threshold >= n or n < 3:
+        return points
+    if threshold < 4:
+        return [points[0], points[-1]]
+    buckets = max((threshold - 2) // 2, 1)
+
+    xs, ys = _columns(points)
+    sampled = [(xs[0], ys[0])]
+    every = (n - 2) / buckets
+    for i in xrange(buckets):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        low = high = start
+        for j in xrange(start + 1, end):
+            y = ys[j]
+            if y < ys[low]:
+                low = j
+            elif y > ys[high]:
+                high = j
+        if low < high:
+            sampled.append((xs[low], ys[low]))
+            sampled.append((xs[high], ys[high]))
+        elif high < low:
+            sampled.append((xs[high], ys[high]))
+            sampled.append((xs[low], ys[low]))
+        else:
+            sampled.append((xs[low], ys[low]))
+
+    sampled.append((xs[-1], ys[-1]))
+    return sampled
+
+
+METHODS = {
+    'lttb': lttb,
+    'minmax': minmax,
+}
+
+
+def get_method(name):
+    """ The downsampling function called *name*, one of METHODS """
+    try:
+        return METHODS[name]
+    except KeyError:
+        raise ValueError("Unknown downsample method %r, expected one of %s" % (name, ', '.join(sorted(METHODS))))
+
+
+__all__ = """
+    lttb
+    minmax
+    get_method
+""".split()
@@ -54,13 +54,66 @@ ranges.
 """
 
 from __future__ import division
+from collections import OrderedDict
 from datetime import date, datetime, timedelta
+from functools import wraps
+import threading
 import time
 import copy
 import math
 
 
 
+#
+# Memoization. Charts drawn in bulk tend to ask for ticks over the same
+# few ranges again and again, so the search for a scale (where the ticks
+# start and stop, and the step between them) is remembered. The tick
+# functions still hand out a fresh iterator on every call.
+#
+
+
+
+#how many distinct ranges each scale function remembers
+MAX_CACHED_SCALES = 128
+
+def memoize_scale(function):
+    """
+    Remember what *function* returned for the last
+    :data:`MAX_CACHED_SCALES` distinct sets of arguments. Its results
+    are shared between callers, so they must be immutable.
+    """
+    cache = OrderedDict()
+    lock = threading.Lock()
+
+    @wraps(function)
+    def memoized(*args, **kwargs):
+        #1 and 1.0 are equal keys but can give differently typed ticks
+        key = (tuple([(type(a), a) for a in args]),
+               tuple(sorted([(k, type(a), a) for k, a in kwargs.items()])))
+        try:
+            hash(key)
+        except TypeError:
+            return function(*args, **kwargs)
+        with lock:
+            found = cache.pop(key, None)
+            if found is not None:
+                cache[key] = found
+        if found is None:
+            found = function(*args, **kwargs)
+            with lock:
+                cache[key] = found
+                while len(cache) > MAX_CACHED_SCALES:
+                    cache.popitem(last=False)
+        return found
+
+    def cache_clear():
+        with lock:
+            cache.clear()
+    memoized.cache_clear = cache_clear
+    return memoized
+
+
+
 #
 # Regular number stuff (code mutated from original work by John
 # Prevost)
@@ -104,27 +157,18 @@ def nice_round(x):
         if x <= cutoff: return result
     return nice_intervals[-1] * z
 
-def nice_ticks(lo, hi, ticks=5, inside=False):
+@memoize_scale
+def nice_scale(lo, hi, ticks=5, inside=False):
     """
-    Find 'nice' places to put *ticks* tick marks for numeric data
-    spanning from *lo* to *hi*.  If *inside* is ``True``, then the
-    nice range will be contained within the input range.  If *inside*
-    is ``False``, then the nice range will contain the input range.
-    To find nice numbers for time data, use :func:`nice_time_ticks`.
-
-    The result is a tuple containing the minimum value of the nice
-    range, the maximum value of the nice range, and an iterator over
-    the tick marks.
-
-    See also :func:`nice_ticks_seq`.
+    The first and last tick and the step between ticks for
+    :func:`nice_ticks`.
     """
-
     delta_x = hi - lo
     if delta_x == 0:
         if lo == 0:
-            return nice_ticks(-1, 1, ticks, inside)
+            return nice_scale(-1, 1, ticks, inside)
         else:
-            return nice_ticks(nice_floor(lo), nice_ceil(hi),
+            return nice_scale(nice_floor(lo), nice_ceil(hi),
                               ticks, inside)
     nice_delta_x = nice_ceil(delta_x)
     delta_t = nice_round(delta_x / (ticks - 1))
@@ -134,6 +178,23 @@ def nice_ticks(lo, hi, ticks=5, inside=False):
     else:
         lo_t = math.floor(lo / delta_t) * delta_t
         hi_t = math.ceil(hi / delta_t) * delta_t
+    return (lo_t, hi_t, delta_t)
+
+def nice_ticks(lo, hi, ticks=5, inside=False):
+    """
+    Find 'nice' places to put *ticks* tick marks for numeric data
+    spanning from *lo* to *hi*.  If *inside* is ``True``, then the
+    nice range will be contained within the input range.  If *inside*
+    is ``False``, then the nice range will contain the input range.
+    To find nice numbers for time data, use :func:`nice_time_ticks`.
+
+    The result is a tuple containing the minimum value of the nice
+    range, the maximum value of the nice range, and an iterator over
+    the tick marks.
+
+    See also :func:`nice_ticks_seq`.
+    """
+    lo_t, hi_t, delta_t = nice_scale(lo, hi, ticks, inside)
 
     def t_iter():
         t = lo_t
@@ -183,20 +244,23 @@ def end_of_month(year, month):
 def month_floor(dt, n):
     """Round datetime down to nearest date that falls evenly on an
     n-month boundary. (E.g., valid intervals for a 3-month
-    boundary are 1/1, 4/1, 7/1, and 10/1)"""
-    year = dt.replace(month=1, day=1, hour=0,
-                      minute=0, second=0, microsecond=0)
-    next = year
-    curr = None
-    if next == dt:
+    boundary are 1/1, 4/1, 7/1, and 10/1)
+
+    Boundaries are counted from the start of dt's year, and the one
+    returned is the last before dt, so a datetime already on a
+    boundary rounds down to the previous one; only the start of the
+    year itself is returned as is."""
+    at_month_start = (dt.day == 1 and dt.hour == 0 and dt.minute == 0
+                      and dt.second == 0 and dt.microsecond == 0)
+    if at_month_start and dt.month == 1:
         return dt
-    else:
-        while next < dt:
-            curr = next
-            if next.month + n > 12:
-                break
-            next = next.replace(month=next.month + n)
-        return curr
+    # zero based month of the last boundary strictly before dt
+    month = dt.month - 1
+    if at_month_start:
+        month -= 1
+    month -= month % n
+    return dt.replace(month=month + 1, day=1, hour=0,
+                      minute=0, second=0, microsecond=0)
 
 
 def month_ceil(dt, n):
@@ -309,8 +373,10 @@ T_r = [
     ([s for s in (1, 2, 5, 15, 30)], SECOND),
     ([m * MINUTE for m in (1, 2, 5, 15, 30)], MINUTE),
     ([h * HOUR  for h in (1, 2, 3, 4, 6, 12)], HOUR),
-    ([DAY], DAY),
-    ([WEEK], WEEK)
+    #without steps of a few days, ranges of one to eight weeks found no
+    #interval better than a second, and a tick for every second in them
+    ([d * DAY for d in (1, 2, 3, 4)], DAY),
+    ([w * WEEK for w in (1, 2)], WEEK)
 ]
 
 
@@ -332,36 +398,35 @@ def coverage(r_d, r_s) :
 # "Calendar" time ticks 
 #
 
-def calendar_time_ticks(lo, hi, ticks=5, inside=False, as_datetime=True):
-    """Nice numbers for times at 'calendar' intervals (months and
-    years) that are sometimes irregular in terms of time passed.
-
-    @type lo: datetime
-    @param lo: low end of time scale
-    
-    @type hi: datetime
-    @param hi: high end of time scale
-    
-    @type ticks: int
-    @param ticks: desired number of tick marks
-    
-    @type inside: bool
-    @param inside: Should the ticks lie inside the lo-hi range?"""
+@memoize_scale
+def calendar_time_scale(lo, hi, ticks=5, inside=False):
+    """
+    The first and last tick, the step between ticks and its unit
+    (:class:`Months` or :class:`Years`) for :func:`calendar_time_ticks`.
+    """
     def as_seconds(dt):
         return time.mktime(dt.timetuple())
     d_range = as_seconds(hi) - as_seconds(lo)
 
-    def intv_time_ticks(lo, hi, intv):
+    # Candidates are scored on plain datetimes; only the winner is
+    # turned into a Months or Years to step through the ticks
+    def months_between(start, end):
+        return (end.year * 12 + end.month) - (start.year * 12 + start.month)
+    def years_between(start, end):
+        return end.year - start.year
+
+    def intv_time_ticks(intv, unit_months, units_between):
+        span = intv * unit_months
         if inside:
-            s_end = hi.floor(intv)
-            s_start = lo.ceil(intv)
+            s_end = month_floor(hi, span)
+            s_start = month_ceil(lo, span)
         else:
-            s_end = hi.ceil(intv)
-            s_start = lo.floor(intv)
-        #print "start: %s" % s_start.dt
-        #print "end  : %s" % s_end.dt
-        s_range_units = s_end - s_start
-        s_range_seconds = as_seconds(s_end.dt) - as_seconds(s_start.dt)
+            s_end = month_ceil(hi, span)
+            s_start = month_floor(lo, span)
+        #print "start: %s" % s_start
+        #print "end  : %s" % s_end
+        s_range_units = units_between(s_start, s_end)
+        s_range_seconds = as_seconds(s_end) - as_seconds(s_start)
         #print "s_range_units:", s_range_units
         s_ticks = s_range_units / intv
         g = granularity(s_ticks, ticks)
@@ -372,21 +437,44 @@ def calendar_time_ticks(lo, hi, ticks=5, inside=False, as_datetime=True):
         return (s_start, s_end, intv, weighted_ave)
 
     candidate = (0, 0, 0, 0)
+    unit = None
     # Go through month intervals first
-    month_lo, month_hi = [Months(x) for x in (lo, hi)]
     for months in (1, 2, 3, 4, 6):
-        new_candidate = intv_time_ticks(month_lo, month_hi, months)
+        new_candidate = intv_time_ticks(months, 1, months_between)
         weighted_ave = new_candidate[3]
         if weighted_ave > candidate[3]:
             candidate = new_candidate
+            unit = Months
     # Do years
-    year_lo, year_hi = [Years(x) for x in (lo, hi)]
     for years in (1, 2, 3, 4, 5, 10, 25):
-        new_candidate = intv_time_ticks(year_lo, year_hi, years)
+        new_candidate = intv_time_ticks(years, 12, years_between)
         weighted_ave = new_candidate[3]
         if weighted_ave > candidate[3]:
             candidate = new_candidate
+            unit = Years
+    if unit is None:
+        raise RuntimeError("Couldn't find usable time scale")
     start, stop, step, score = candidate
+    return (start, stop, step, unit)
+
+def calendar_time_ticks(lo, hi, ticks=5, inside=False, as_datetime=True):
+    """Nice numbers for times at 'calendar' intervals (months and
+    years) that are sometimes irregular in terms of time passed.
+
+    @type lo: datetime
+    @param lo: low end of time scale
+    
+    @type hi: datetime
+    @param hi: high end of time scale
+    
+    @type ticks: int
+    @param ticks: desired number of tick marks
+    
+    @type inside: bool
+    @param inside: Should the ticks lie inside the lo-hi range?"""
+    start, stop, step, unit = calendar_time_scale(lo, hi, ticks, inside)
+    start = unit(start, orig_day=lo.day)
+    stop = unit(stop, orig_day=hi.day)
     # return the beginning and end of the range, and an iterator
     # through it
     def tts(dt):
@@ -409,21 +497,12 @@ def calendar_time_ticks(lo, hi, ticks=5, inside=False, as_datetime=True):
 # "Regular" time ticks
 #
 
-def regular_time_ticks(lo, hi, ticks=5, inside=False, as_datetime=True):
-    """Nice numbers for times at regular intervals---seconds, minutes,
-    days, weeks.
-
-    @type lo: float
-    @param lo: low end of time scale, in seconds
-    
-    @type hi: float
-    @param hi: high end of time scale, in seconds
-    
-    @type ticks: int
-    @param ticks: desired number of tick marks
-    
-    @type inside: bool
-    @param inside: Should the ticks lie inside the lo-hi range?"""
+@memoize_scale
+def regular_time_scale(lo, hi, ticks=5, inside=False):
+    """
+    The first and last tick and the step between ticks, all in
+    seconds, for :func:`regular_time_ticks`.
+    """
     # Convenience functions
     def interval_floor(intv, x): return (x // intv) * intv
     def interval_ceil(intv, x): return ((x // intv) * intv) + intv
@@ -456,6 +535,24 @@ def regular_time_ticks(lo, hi, ticks=5, inside=False, as_datetime=True):
     if candidate[0] is None:
         raise RuntimeError("Couldn't find usable time scale")
     start, stop, step, score = candidate
+    return (start, stop, step)
+
+def regular_time_ticks(lo, hi, ticks=5, inside=False, as_datetime=True):
+    """Nice numbers for times at regular intervals---seconds, minutes,
+    days, weeks.
+
+    @type lo: float
+    @param lo: low end of time scale, in seconds
+    
+    @type hi: float
+    @param hi: high end of time scale, in seconds
+    
+    @type ticks: int
+    @param ticks: desired number of tick marks
+    
+    @type inside: bool
+    @param inside: Should the ticks lie inside the lo-hi range?"""
+    start, stop, step = regular_time_scale(lo, hi, ticks, inside)
     # Some shorthand
     def fts(s):
         return datetime.fromtimestamp(s)
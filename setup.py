@@ -1,5 +1,8 @@
 
-from distutils.core import setup
+try:
+    from setuptools import setup
+except ImportError:
+    from distutils.core import setup
 
 setup(
     name='Charty',
@@ -11,5 +14,7 @@ setup(
     license='LICENSE.txt',
     description='Another Python SVG Chart Generator that uses CSS smartly',
     long_description=open('README').read(),
+    #render_async needs asyncio, which Python 2 only has as trollius
+    extras_require={'async': ['trollius']},
 )
 
@@ -0,0 +1,56 @@
+"""
+render_async must give the same document render_bytes does, hold a
+semaphore while drawing, and not start a chart whose future was cancelled
+while it waited for one.
+"""
+
+import unittest
+
+from charty import render_async
+from charty.aio import asyncio
+from charty.batch import render_spec
+from charty.charty import Line
+
+SPEC = ('Line', 300, 200, [[(i, i * i) for i in xrange(20)]])
+
+
+@unittest.skipIf(asyncio is None, "needs asyncio or trollius")
+class RenderAsyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_future(self, future):
+        return self.loop.run_until_complete(future)
+
+    def test_matches_render_bytes(self):
+        self.assertEqual(self.run_future(render_async(SPEC, loop=self.loop)), render_spec(SPEC))
+        self.assertEqual(self.run_future(render_async(SPEC, compress=True, loop=self.loop)), render_spec(SPEC, compress=True))
+        chart = Line(300, 200, [[(1, 2), (2, 3)]])
+        self.assertEqual(self.run_future(render_async(chart, loop=self.loop)), Line(300, 200, [[(1, 2), (2, 3)]]).render_bytes())
+
+    def test_semaphore_is_released(self):
+        semaphore = asyncio.Semaphore(1, loop=self.loop)
+        futures = [render_async(SPEC, semaphore=semaphore, loop=self.loop) for i in xrange(3)]
+        results = self.run_future(asyncio.gather(*futures, loop=self.loop))
+        self.assertEqual(results, [render_spec(SPEC)] * 3)
+        self.assertFalse(semaphore.locked())
+
+    def test_cancelled_while_waiting(self):
+        semaphore = asyncio.Semaphore(1, loop=self.loop)
+        self.run_future(semaphore.acquire())
+        chart = Line(300, 200, [[(1, 2), (2, 3)]])
+        future = render_async(chart, semaphore=semaphore, loop=self.loop)
+        future.cancel()
+        semaphore.release()
+        self.run_future(asyncio.sleep(0.05, loop=self.loop))
+        self.assertTrue(future.cancelled())
+        self.assertTrue(chart._svg is None)
+        self.assertFalse(semaphore.locked())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+A StackedColumn's x notches must fall in the gaps between its bars, whether
+the labels get a slot each or are placed by value on a sparse or time axis.
+"""
+
+import re
+import unittest
+from datetime import date, timedelta
+
+from charty.charty import StackedColumn
+
+BAR = re.compile(r'<rect class="series-0-point" height="[^"]+" width="([^"]+)" x="([^"]+)"')
+NOTCH = re.compile(r'<path class="x-notch(?:-left)?" d="M ([^ ]+) ')
+
+
+class NotchTest(unittest.TestCase):
+
+    def assertNotchesBetweenBars(self, labels, **options):
+        chart = StackedColumn(600, 300, [[(l, i + 1) for i, l in enumerate(labels)]], x_padding=10, **options)
+        svg = chart.render_bytes()
+        bars = [(float(x), float(x) + float(width)) for width, x in BAR.findall(svg)]
+        notches = [float(x) for x in NOTCH.findall(svg)][1:] #the first is the y axis'
+        self.assertEqual(len(notches), len(bars))
+        for i, (left, right) in enumerate(bars):
+            self.assertTrue(notches[i] <= left, (i, notches[i], left))
+            if i:
+                self.assertTrue(notches[i] >= bars[i - 1][1], (i, notches[i], bars[i - 1][1]))
+
+    def test_label_slots(self):
+        self.assertNotchesBetweenBars(['a', 'b', 'c', 'd'])
+        self.assertNotchesBetweenBars([1, 2, 3, 4, 5])
+
+    def test_sparse_axis(self):
+        self.assertNotchesBetweenBars([1.5, 2, 3, 7.5, 12])
+
+    def test_time_axis(self):
+        first = date(2021, 3, 1)
+        self.assertNotchesBetweenBars([first + timedelta(days=d) for d in (0, 1, 4, 5, 13)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+render_batch must report every spec exactly once, whether it rendered, failed
+while drawing, or couldn't be sent to a worker at all.
+"""
+
+import unittest
+
+from charty import render_batch
+from charty.batch import render_spec
+
+
+def squares():
+    for i in xrange(10):
+        yield (i, i * i)
+
+
+class RenderBatchTest(unittest.TestCase):
+
+    def test_results_match_render_spec(self):
+        specs = [('Line', 300, 200, [[(i, i * k) for i in xrange(20)]]) for k in xrange(12)]
+        results = sorted(render_batch(specs, workers=2, chunksize=3))
+        self.assertEqual([r.index for r in results], range(12))
+        for result, spec in zip(results, specs):
+            self.assertEqual(result.svg, render_spec(spec))
+
+    def test_failures_are_reported_per_spec(self):
+        specs = []
+        for i in xrange(3):
+            specs.extend([
+                ('Line', 300, 200, [[(1, 2), (2, 3)]]),
+                #a generator can't be pickled as is, so it's read into a list first
+                ('Line', 300, 200, [squares()]),
+                #a lambda can't be pickled at all
+                ('Column', 300, 200, [[(1, 2)]], None, {'phase_hook': lambda *args: None}),
+                ('Nonesuch', 300, 200, [[(1, 2)]]),
+            ])
+        results = sorted(render_batch(specs, workers=2, chunksize=2))
+        self.assertEqual([r.index for r in results], range(len(specs)))
+        for result in results:
+            if result.index % 4 < 2:
+                self.assertTrue(result.svg, result.error)
+            else:
+                self.assertEqual(result.svg, None)
+                self.assertTrue(result.error)
+        self.assertEqual(results[1].svg, render_spec(('Line', 300, 200, [list(squares())])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Charts drawn from columns of arrays must come out byte for byte the same as
+charts drawn from the equivalent lists of (x, y) tuples.
+
+Run from the top of the project with: python -m unittest discover tests
+"""
+
+import random
+import unittest
+from array import array
+from collections import OrderedDict
+
+from charty import coordinates
+from charty.charty import Line, Column, StackedColumn
+from charty.series import Columns
+from charty.stats import DataStats
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CHARTS = [
+    (Line, {}),
+    (Line, {'precision': 2}),
+    (Line, {'compact_paths': True}),
+    (Line, {'downsample': 'minmax', 'max_points': 50}),
+    (Column, {}),
+    (Column, {'merge_bars': True}),
+    (StackedColumn, {}),
+]
+
+
+def random_series(count, size, seed):
+    rnd = random.Random(seed)
+    return [[(x, round(rnd.uniform(0, 1000), 3)) for x in xrange(size)] for i in xrange(count)]
+
+
+class ColumnsTest(unittest.TestCase):
+
+    def assertSameCharts(self, points, columns):
+        for chart, options in CHARTS:
+            expected = chart(600, 300, points, **options).render_bytes()
+            actual = chart(600, 300, columns, **options).render_bytes()
+            self.assertEqual(expected, actual, '%s %s' % (chart.__name__, options))
+
+    def test_array_columns(self):
+        points = random_series(3, 400, 1)
+        columns = [(array('l', [x for x, y in s]), array('d', [y for x, y in s])) for s in points]
+        self.assertSameCharts(points, columns)
+
+    @unittest.skipIf(numpy is None, "needs numpy")
+    def test_numpy_columns(self):
+        points = random_series(3, 400, 2)
+        columns = [(numpy.array([x for x, y in s]), numpy.array([y for x, y in s])) for s in points]
+        self.assertSameCharts(points, columns)
+
+    def test_mapping_of_columns(self):
+        points = random_series(2, 50, 3)
+        columns = OrderedDict(('series %s' % i, ([x for x, y in s], [y for x, y in s])) for i, s in enumerate(points))
+        self.assertSameCharts(points, columns)
+
+
+@unittest.skipIf(numpy is None, "needs numpy")
+class PlacementTest(unittest.TestCase):
+    """ Series placed in bulk by coordinates.py must come out as the per-point loops draw them """
+
+    def assertPlaced(self, columns, placed=True):
+        points = [zip(xs.tolist(), ys.tolist()) for xs, ys in columns]
+        for chart, options in CHARTS + [(Line, {'sparse_labels': True}), (StackedColumn, {'merge_bars': True})]:
+            expected = chart(600, 300, points, **options).render_bytes()
+            drawn = chart(600, 300, columns, **options)
+            self.assertEqual(drawn.render_bytes(), expected, '%s %s' % (chart.__name__, options))
+            self.assertEqual(coordinates.place(drawn, drawn.data[0]) is not None, placed, '%s %s' % (chart.__name__, options))
+
+    def test_value_types(self):
+        rnd = random.Random(5)
+        xs = numpy.arange(0, 300, 3)
+        for dtype in ('float64', 'float32', 'int64', 'int16', 'uint8'):
+            self.assertPlaced([(xs, numpy.array([rnd.uniform(-100, 200) for x in xs]).astype(dtype)),
+                               (xs[::2], numpy.array([rnd.uniform(0, 50) for x in xs[::2]]).astype(dtype))])
+
+    def test_label_types(self):
+        rnd = random.Random(6)
+        ys = numpy.array([rnd.uniform(0, 100) for i in xrange(50)])
+        self.assertPlaced([(numpy.arange(50) * 0.25 - 3, ys)])
+        self.assertPlaced([(numpy.arange(50).astype('int32'), ys), (numpy.arange(0.0, 50.0, 2.0), ys[:25])])
+
+    def test_falls_back(self):
+        self.assertPlaced([(numpy.arange(5), numpy.array([2 ** 60, 1, 2, 3, 2 ** 61]))], placed=False)
+        self.assertPlaced([(numpy.array([2 ** 60, 2 ** 60 + 1]), numpy.array([1.5, 2.5])), (numpy.array([0.5]), numpy.array([1.0]))], placed=False)
+
+
+def described(stats):
+    """ Everything a DataStats holds, with the type of every number """
+    def typed(value):
+        return (type(value), repr(value))
+    return (typed(stats.min_y), typed(stats.max_y), typed(stats.total),
+            sorted((typed(k), typed(v)) for k, v in stats.stack_totals.items()),
+            [typed(l) for l in stats.labels], stats.numeric_labels)
+
+
+@unittest.skipIf(numpy is None, "needs numpy")
+class ArrayStatsTest(unittest.TestCase):
+
+    def assertSameStats(self, columns):
+        points = [series if series == 'placeholder' else list(series) for series in columns]
+        self.assertEqual(described(DataStats(columns)), described(DataStats(points)))
+
+    def test_matches_the_loop(self):
+        rnd = random.Random(4)
+        for i in xrange(200):
+            xs_type = rnd.choice(['int64', 'float64', 'int32', 'l', 'd'])
+            ys_type = rnd.choice(['int64', 'float64', 'float32', 'uint16', 'l', 'd', 'i'])
+            columns = []
+            for j in xrange(rnd.randint(1, 4)):
+                if rnd.random() < 0.1:
+                    columns.append('placeholder')
+                    continue
+                size = rnd.choice([0, 1, 5, 300])
+                xs = [rnd.randint(0, 40) for k in xrange(size)]
+                ys = [rnd.uniform(0, 1000) if 'f' in ys_type or ys_type == 'd' else rnd.randint(0, 1000) for k in xrange(size)]
+                if len(xs_type) == 1:
+                    columns.append(Columns(array(xs_type, xs), array(ys_type, ys) if len(ys_type) == 1 else numpy.array(ys, dtype=ys_type)))
+                else:
+                    columns.append(Columns(numpy.array(xs, dtype=xs_type), numpy.array(ys, dtype=ys_type) if len(ys_type) > 1 else array(ys_type, ys)))
+            self.assertSameStats(columns)
+
+    def test_falls_back_to_the_loop(self):
+        self.assertSameStats([Columns(numpy.arange(3), numpy.array([1.0, float('nan'), 2.0]))])
+        self.assertSameStats([Columns(numpy.arange(3), numpy.array([1, 2, 3])), Columns(numpy.arange(3.0), numpy.array([1, 2, 3]))])
+        self.assertSameStats([Columns(numpy.arange(3), numpy.array([2 ** 62, 1, 2 ** 62]))])
+        self.assertSameStats([Columns(numpy.arange(2), numpy.arange(2)), [(5, 1), ('a', 2)]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+"""
+Every element id in a dashboard must be unique, without changing the charts'
+own documents.
+"""
+
+import re
+import unittest
+
+from charty import Dashboard
+from charty.charty import Line, Column, Sparkline
+
+IDS = re.compile(r' id="([^"]+)"')
+
+
+class DashboardIdsTest(unittest.TestCase):
+
+    def test_ids_are_unique_per_frame(self):
+        charts = [Line(300, 200, [[(x, x * k) for x in xrange(10)]]) for k in xrange(3)]
+        charts.append(Column(300, 200, [[(x, x) for x in xrange(10)]], backend='lite'))
+        alone = [chart.render_bytes() for chart in charts]
+        board = Dashboard(charts, columns=2)
+        svg = board.render_bytes()
+        ids = IDS.findall(svg)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(ids[:3], ['frame0-grid', 'frame0-x_axis', 'frame0-y_axis'])
+        self.assertEqual(ids[-3:], ['frame3-grid', 'frame3-x_axis', 'frame3-y_axis'])
+        self.assertEqual([chart.render_bytes() for chart in charts], alone)
+        self.assertEqual(board.render_bytes(), svg)
+
+    def test_frames_keep_the_chart_root_attributes(self):
+        spark = Sparkline(100, 20, [[(x, x % 7) for x in xrange(20)]], markers=('max',))
+        board = Dashboard([Line(300, 200, [[(x, x) for x in xrange(10)]]), spark], columns=2)
+        frames = [node for node in board.render() if node.tag == 'svg']
+        self.assertEqual(frames[0].attrib, {'x': '0', 'y': '0', 'height': '200', 'width': '300'})
+        self.assertEqual(frames[1].get('fill'), 'currentColor')
+        self.assertEqual(frames[1].get('xmlns'), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+The statistics read_csv and read_binary gather while reading must be the ones
+a chart would have gathered from the data itself, so charts drawn with them
+come out the same.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from array import array
+from StringIO import StringIO
+
+from charty import loaders
+from charty.charty import Line, StackedColumn
+from charty.loaders import read_csv, read_binary
+from charty.stats import DataStats
+
+
+def described(stats):
+    return (stats.min_y, stats.max_y, repr(stats.total), stats.labels, stats.numeric_labels,
+            sorted((label, repr(total)) for label, total in stats.stack_totals.items()))
+
+
+class LoadersTest(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(24)
+        self.rows = [(rnd.randint(0, 60), rnd.uniform(-100, 100), rnd.uniform(0, 1000)) for i in xrange(500)]
+        fd, self.path = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def assertRoundTrip(self, table):
+        self.assertEqual(described(table.stats), described(DataStats(table.data)))
+        for chart in (Line, StackedColumn):
+            self.assertEqual(chart(600, 300, table.data, data_stats=table.stats).render_bytes(),
+                             chart(600, 300, table.data).render_bytes())
+
+    def test_csv(self):
+        text = 'day,north,south\n' + ''.join('%s,%r,%r\n' % row for row in self.rows)
+        table = read_csv(StringIO(text), x='day')
+        self.assertEqual(table.names, ['north', 'south'])
+        self.assertEqual(list(table.data[0]), [(x, a) for x, a, b in self.rows])
+        self.assertRoundTrip(table)
+
+    def test_tsv_with_gaps(self):
+        text = ''.join('%s\t%r\t%s\n' % (x, a, b if x % 3 else '') for x, a, b in self.rows)
+        table = read_csv(StringIO(text))
+        self.assertEqual(len(table.data[1]), len([x for x, a, b in self.rows if x % 3]))
+        self.assertRoundTrip(table)
+
+    def test_labels_too_big_for_an_array(self):
+        table = read_csv(StringIO('1,2\n%s,3\n5,4\n' % 2 ** 70))
+        self.assertEqual(list(table.data[0].xs), [1, 2 ** 70, 5])
+        self.assertEqual(table.stats.labels, [1, 2 ** 70, 5])
+
+    def test_binary(self):
+        f = open(self.path, 'wb')
+        array('d', [value for row in self.rows for value in row]).tofile(f)
+        f.close()
+        self.assertRoundTrip(read_binary(self.path, 3))
+        numpy, loaders.numpy = loaders.numpy, None
+        try:
+            self.assertRoundTrip(read_binary(self.path, 3))
+        finally:
+            loaders.numpy = numpy
+
+    def test_binary_integers(self):
+        f = open(self.path, 'wb')
+        array('l', [int(value) for row in self.rows for value in row]).tofile(f)
+        f.close()
+        table = read_binary(self.path, 3, typecode='l')
+        self.assertTrue(isinstance(table.stats.stack_totals[self.rows[0][0]], (int, long)))
+        self.assertRoundTrip(table)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+The memoized scale functions and the arithmetic month_floor in
+charty/utils/nice.py must give exactly what the original implementations
+gave. Those originals are kept below as the reference.
+"""
+
+from __future__ import division
+import math
+import random
+import time
+import unittest
+from datetime import datetime, timedelta
+from itertools import islice
+
+from charty.utils import nice
+
+
+#
+# The original implementations, before memoization and the arithmetic
+# month_floor
+#
+
+def reference_month_floor(dt, n):
+    year = dt.replace(month=1, day=1, hour=0,
+                      minute=0, second=0, microsecond=0)
+    next = year
+    curr = None
+    if next == dt:
+        return dt
+    else:
+        while next < dt:
+            curr = next
+            if next.month + n > 12:
+                break
+            next = next.replace(month=next.month + n)
+        return curr
+
+
+def reference_month_ceil(dt, n):
+    f = reference_month_floor(dt, n)
+    if f.month + n - 1 > 12:
+        new_year = f.year + 1
+        new_month = (((f.month - 1) + n) % 12) + 1
+        return f.replace(year=new_year, month=new_month)
+    else:
+        return f.replace(month=f.month + n - 1)
+
+
+def reference_nice_ticks(lo, hi, ticks=5, inside=False):
+    delta_x = hi - lo
+    if delta_x == 0:
+        if lo == 0:
+            return reference_nice_ticks(-1, 1, ticks, inside)
+        else:
+            return reference_nice_ticks(nice.nice_floor(lo), nice.nice_ceil(hi),
+                                        ticks, inside)
+    delta_t = nice.nice_round(delta_x / (ticks - 1))
+    if inside:
+        lo_t = math.ceil(lo / delta_t) * delta_t
+        hi_t = math.floor(hi / delta_t) * delta_t
+    else:
+        lo_t = math.floor(lo / delta_t) * delta_t
+        hi_t = math.ceil(hi / delta_t) * delta_t
+
+    def t_iter():
+        t = lo_t
+        while t <= hi_t:
+            yield t
+            t = t + delta_t
+    return (lo_t, hi_t, t_iter())
+
+
+class ReferenceMonths(nice.Months):
+    def floor(self, n):
+        return ReferenceMonths(reference_month_floor(self.dt, n), orig_day=self.orig_day)
+    def ceil(self, n):
+        return ReferenceMonths(reference_month_ceil(self.dt, n), orig_day=self.orig_day)
+
+
+class ReferenceYears(nice.Years):
+    def floor(self, n):
+        return ReferenceYears(reference_month_floor(self.dt, n * 12), orig_day=self.orig_day)
+    def ceil(self, n):
+        return ReferenceYears(reference_month_ceil(self.dt, n * 12), orig_day=self.orig_day)
+
+
+def reference_calendar_time_ticks(lo, hi, ticks=5, inside=False):
+    def as_seconds(dt):
+        return time.mktime(dt.timetuple())
+    d_range = as_seconds(hi) - as_seconds(lo)
+
+    def intv_time_ticks(lo, hi, intv):
+        if inside:
+            s_end = hi.floor(intv)
+            s_start = lo.ceil(intv)
+        else:
+            s_end = hi.ceil(intv)
+            s_start = lo.floor(intv)
+        s_range_units = s_end - s_start
+        s_range_seconds = as_seconds(s_end.dt) - as_seconds(s_start.dt)
+        s_ticks = s_range_units / intv
+        g = nice.granularity(s_ticks, ticks)
+        c = nice.coverage(d_range, s_range_seconds)
+        return (s_start, s_end, intv, (g + c) / 2)
+
+    candidate = (0, 0, 0, 0)
+    month_lo, month_hi = [ReferenceMonths(x) for x in (lo, hi)]
+    for months in (1, 2, 3, 4, 6):
+        new_candidate = intv_time_ticks(month_lo, month_hi, months)
+        if new_candidate[3] > candidate[3]:
+            candidate = new_candidate
+    year_lo, year_hi = [ReferenceYears(x) for x in (lo, hi)]
+    for years in (1, 2, 3, 4, 5, 10, 25):
+        new_candidate = intv_time_ticks(year_lo, year_hi, years)
+        if new_candidate[3] > candidate[3]:
+            candidate = new_candidate
+    start, stop, step, score = candidate
+
+    def dt_iter():
+        curr = start
+        while curr.dt <= stop.dt:
+            yield curr.dt
+            curr += step
+    return start.dt, stop.dt, dt_iter()
+
+
+def random_datetime(rnd):
+    dt = datetime(rnd.randint(1971, 2035), rnd.randint(1, 12), rnd.randint(1, 28))
+    kind = rnd.randint(0, 3)
+    if kind == 0:
+        #exactly on a month boundary
+        return dt.replace(day=1)
+    if kind == 1:
+        return dt
+    return dt + timedelta(seconds=rnd.randint(0, 86399), microseconds=rnd.randint(0, 1) * rnd.randint(0, 999999))
+
+
+class MonthBoundaryTest(unittest.TestCase):
+
+    def test_floor_and_ceil_match_reference(self):
+        rnd = random.Random(13)
+        for i in xrange(20000):
+            dt = random_datetime(rnd)
+            for n in (1, 2, 3, 4, 6, 12, 24, 36, 60, 120, 300):
+                self.assertEqual(nice.month_floor(dt, n), reference_month_floor(dt, n), (dt, n))
+                self.assertEqual(nice.month_ceil(dt, n), reference_month_ceil(dt, n), (dt, n))
+
+    def test_calendar_ticks_match_reference(self):
+        rnd = random.Random(14)
+        checked = 0
+        for i in xrange(1500):
+            lo = random_datetime(rnd)
+            hi = lo + timedelta(days=rnd.choice([40, 200, 800, 3000, 12000]) * rnd.random() + 1)
+            ticks = rnd.randint(3, 10)
+            inside = rnd.random() < 0.5
+            try:
+                expected = reference_calendar_time_ticks(lo, hi, ticks, inside)
+            except (AttributeError, ZeroDivisionError):
+                #the original failed outright on ranges no interval fits
+                continue
+            nice.calendar_time_scale.cache_clear()
+            actual = nice.calendar_time_ticks(lo, hi, ticks, inside)
+            self.assertEqual(actual[:2], expected[:2], (lo, hi, ticks, inside))
+            self.assertEqual(list(islice(actual[2], 60)), list(islice(expected[2], 60)), (lo, hi, ticks, inside))
+            checked += 1
+        self.assertTrue(checked > 1000)
+
+
+class RegularTimeTicksTest(unittest.TestCase):
+
+    def test_a_handful_of_ticks_up_to_eight_weeks(self):
+        lo = datetime(2020, 1, 1)
+        for hours in xrange(1, 8 * 7 * 24, 7):
+            ticks = list(islice(nice.nice_time_ticks(lo, lo + timedelta(hours=hours), 5)[2], 100))
+            self.assertTrue(2 <= len(ticks) <= 12, (hours, len(ticks)))
+
+
+class NiceScaleTest(unittest.TestCase):
+
+    def test_ticks_match_reference(self):
+        rnd = random.Random(15)
+        for i in xrange(5000):
+            scale = 10 ** rnd.randint(-3, 9)
+            lo = rnd.choice([0, rnd.uniform(-1, 1) * scale, rnd.randint(-100, 100)])
+            hi = rnd.choice([lo, lo + rnd.uniform(0, 2) * scale, lo + rnd.randint(0, 1000)])
+            ticks = rnd.randint(2, 12)
+            inside = rnd.random() < 0.5
+            try:
+                expected = reference_nice_ticks(lo, hi, ticks, inside)
+            except RuntimeError:
+                #an empty range on a nice number recursed forever, and still does
+                self.assertRaises(RuntimeError, nice.nice_ticks, lo, hi, ticks, inside)
+                continue
+            #each range is asked for twice, so the second comes from the cache
+            for attempt in xrange(2):
+                actual = nice.nice_ticks(lo, hi, ticks, inside)
+                self.assertEqual(actual[:2], expected[:2], (lo, hi, ticks, inside))
+                self.assertEqual(list(islice(actual[2], 100)), list(islice(reference_nice_ticks(lo, hi, ticks, inside)[2], 100)))
+
+    def test_cached_ticks_are_fresh_iterators(self):
+        first = nice.nice_ticks(0, 100, 5)[2]
+        self.assertEqual(list(first), [0.0, 25.0, 50.0, 75.0, 100.0])
+        self.assertEqual(list(nice.nice_ticks(0, 100, 5)[2]), [0.0, 25.0, 50.0, 75.0, 100.0])
+
+    def test_equal_arguments_of_different_types(self):
+        for lo, hi in ((0, 10), (0.0, 10.0), (0, 0), (0.0, 0.0)):
+            expected = tuple(reference_nice_ticks(lo, hi)[2])
+            actual = nice.nice_ticks_seq(lo, hi)
+            self.assertEqual(actual, expected)
+            self.assertEqual([type(t) for t in actual], [type(t) for t in expected])
+
+    def test_results_survive_eviction(self):
+        nice.nice_scale.cache_clear()
+        for i in xrange(nice.MAX_CACHED_SCALES * 2):
+            nice.nice_scale(0, i + 1)
+        self.assertEqual(nice.nice_scale(0, 1), reference_nice_ticks(0, 1)[:2] + (nice.nice_round(1 / 4),))
+
+
+if __name__ == '__main__':
+    unittest.main()
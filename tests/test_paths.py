@@ -0,0 +1,93 @@
+"""
+compact_path must trace the same points as writing every coordinate in full,
+rounded to its precision, however tightly it packs the numbers together.
+"""
+
+import random
+import re
+import unittest
+
+from charty.paths import compact_path, absolute_path, number_formatter, PATH_PRECISION
+
+NUMBER = re.compile(r'-?(?:\d+(?:\.\d*)?|\.\d+)')
+
+
+def trace(path):
+    """ The absolute points a path of one moveto and one relative lineto passes through """
+    if not path:
+        return []
+    moveto, _, lineto = path[1:].partition('l')
+    x, y = [float(n) for n in NUMBER.findall(moveto)]
+    points = [(x, y)]
+    steps = [float(n) for n in NUMBER.findall(lineto)]
+    for dx, dy in zip(steps[::2], steps[1::2]):
+        x += dx
+        y += dy
+        points.append((x, y))
+    return points
+
+
+def rounded(points, precision):
+    """ points rounded as compact_path rounds them, dropping repeats """
+    scale = 10 ** precision
+    kept = []
+    for x, y in points:
+        point = (int(round(x * scale)), int(round(y * scale)))
+        if not kept or point != kept[-1]:
+            kept.append(point)
+    return kept
+
+
+class CompactPathTest(unittest.TestCase):
+
+    def assertTraces(self, points, precision):
+        path = compact_path(points, precision)
+        scale = 10 ** (PATH_PRECISION if precision is None else precision)
+        traced = [(int(round(x * scale)), int(round(y * scale))) for x, y in trace(path)]
+        self.assertEqual(traced, rounded(points, PATH_PRECISION if precision is None else precision), path)
+
+    def test_random_lines(self):
+        rnd = random.Random(18)
+        for i in xrange(300):
+            count = rnd.randint(1, 200)
+            spread = rnd.choice([0.01, 1, 50, 10000])
+            x = rnd.uniform(-spread, spread)
+            points = []
+            for j in xrange(count):
+                x += rnd.uniform(0, spread / 10.0)
+                points.append((x, rnd.uniform(-spread, spread)))
+            for precision in (None, 0, 1, 2, 3):
+                self.assertTraces(points, precision)
+
+    def test_numbers_run_together(self):
+        path = compact_path([(0, 0), (0.5, -0.5), (1, 0), (1.5, 0.5)])
+        self.assertEqual(path, 'M0 0l.5-.5.5.5.5.5')
+        self.assertTraces([(0, 0), (0.5, -0.5), (1, 0), (1.5, 0.5)], None)
+
+    def test_repeated_points_are_dropped(self):
+        self.assertEqual(compact_path([(1, 1), (1.01, 1.01), (2, 1)]), 'M1 1l1 0')
+
+    def test_empty_and_single_point(self):
+        self.assertEqual(compact_path([]), '')
+        self.assertEqual(compact_path(iter([(3, 4)])), 'M3 4')
+
+    def test_same_points_as_absolute_path(self):
+        points = [(i * 2.25, (i * 37) % 11 - 5.5) for i in xrange(50)]
+        absolute = [float(n) for n in NUMBER.findall(absolute_path(points, 2))]
+        traced = trace(compact_path(points, 2))
+        self.assertEqual(len(traced) * 2, len(absolute))
+        for (x, y), ax, ay in zip(traced, absolute[::2], absolute[1::2]):
+            self.assertAlmostEqual(x, ax, 6)
+            self.assertAlmostEqual(y, ay, 6)
+
+
+class NumberFormatterTest(unittest.TestCase):
+
+    def test_precision(self):
+        format_number = number_formatter(2)
+        self.assertEqual([format_number(v) for v in (1.0, 1.5, 1.257, -0.001, 100)], ['1', '1.5', '1.26', '0', '100'])
+        self.assertEqual(number_formatter(None)(1.5), '1.5')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+A Line drawn in a single pass from iterators and its x_range and y_range
+must come out the same as one drawn from lists of the same points.
+"""
+
+import unittest
+from datetime import date, timedelta
+
+from charty.charty import Line
+
+
+def points(label, count=20):
+    for i in xrange(count):
+        yield (label(i), (i * 37) % 50)
+
+
+class SinglePassTest(unittest.TestCase):
+
+    def assertSameChart(self, label, x_range, **options):
+        expected = Line(600, 300, [list(points(label))], **options).render_bytes()
+        chart = Line(600, 300, [points(label)], x_range=x_range, y_range=(0, 49), **options)
+        self.assertEqual(chart.render_bytes(), expected)
+        return chart
+
+    def test_numbers(self):
+        chart = self.assertSameChart(lambda i: i * 3, (0, 57))
+        self.assertTrue(chart.single_pass())
+        self.assertSameChart(lambda i: i * 3, (0, 57), downsample='lttb', max_points=8)
+
+    def test_dates(self):
+        first = date(2020, 1, 1)
+        chart = self.assertSameChart(lambda i: first + timedelta(days=i), (first, first + timedelta(days=19)))
+        self.assertTrue(chart.single_pass())
+
+    def test_text_labels_are_read_first(self):
+        chart = self.assertSameChart(lambda i: 'day %02d' % i, ('day 00', 'day 19'))
+        self.assertFalse(chart.single_pass())
+        self.assertTrue(isinstance(chart.data[0], list))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+"""
+A Sparkline's marker dots must sit on the points its line passes through, and
+markers it doesn't know must be refused.
+"""
+
+import re
+import unittest
+
+from charty.charty import Sparkline
+
+NUMBER = re.compile(r'-?\d+(?:\.\d*)?')
+CIRCLE = re.compile(r'<circle class="(\w+)-marker" cx="([^"]+)" cy="([^"]+)"')
+
+
+class SparklineTest(unittest.TestCase):
+
+    def test_markers_sit_on_the_line(self):
+        values = [5, -3, 12.5, 7, 0, 9, 2]
+        chart = Sparkline(100, 20, [[(i, v) for i, v in enumerate(values)]], markers=('min', 'max', 'last'))
+        svg = chart.render_bytes()
+        path = re.search(r' d="([^"]+)"', svg).group(1)
+        numbers = [float(n) for n in NUMBER.findall(path)]
+        points = zip(numbers[::2], numbers[1::2])
+        self.assertEqual(len(points), len(values))
+        markers = dict((name, (float(cx), float(cy))) for name, cx, cy in CIRCLE.findall(svg))
+        self.assertEqual(markers, {'min': points[1], 'max': points[2], 'last': points[-1]})
+
+    def test_unknown_marker(self):
+        self.assertRaises(ValueError, Sparkline, 100, 20, [[(0, 1), (1, 2)]], markers=('first',))
+
+    def test_flat_and_empty_series(self):
+        svg = Sparkline(100, 20, [[(0, 4), (1, 4)], []]).render_bytes()
+        self.assertEqual(svg.count('<path'), 1)
+        self.assertTrue('d="M1.0 10.0 99.0 10.0"' in svg, svg)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+Stylesheet arguments: paths are read from disk and cached, and css given as a
+string is wrapped in a Stylesheet, whatever it looks like.
+"""
+
+import os
+import tempfile
+import unittest
+
+from charty import Stylesheet
+from charty.charty import Line
+from charty.stylesheet import get_stylesheet, clear_stylesheet_cache
+
+DATA = [[(0, 1), (1, 3), (2, 2)]]
+
+
+class StylesheetTest(unittest.TestCase):
+
+    def test_inline_css_of_any_kind(self):
+        for css in ('', '/* nothing yet */', '.series-1-line { stroke: red }'):
+            sheet = Stylesheet(css)
+            self.assertTrue(get_stylesheet(sheet) is sheet)
+            chart = Line(300, 200, DATA, sheet)
+            self.assertTrue(chart.render()[0] is sheet.node)
+            self.assertTrue(chart.render_bytes())
+
+    def test_paths_are_files(self):
+        fd, path = tempfile.mkstemp(suffix='.css')
+        os.write(fd, '.grid { fill: none }')
+        os.close(fd)
+        try:
+            clear_stylesheet_cache()
+            sheet = get_stylesheet(path)
+            self.assertEqual(sheet.css, '.grid { fill: none }')
+            self.assertTrue(get_stylesheet(path) is sheet)
+        finally:
+            os.remove(path)
+        self.assertRaises((IOError, OSError), get_stylesheet, '')
+
+
+if __name__ == '__main__':
+    unittest.main()